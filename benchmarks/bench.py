@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Benchmark Document.summary(), title() and short_title().
+
+    python benchmarks/bench.py                       # run and report
+    python benchmarks/bench.py --save                # store as the baseline
+    python benchmarks/bench.py --threshold 0.15      # compare, exit 1 on regression
+
+With --stages, the time spent per document in every stage of the
+pipeline is reported as well.
+
+Every case runs in a fresh process, so the peak resident memory reported is
+the case's own.  Timings are machine dependent: compare against a baseline
+saved on the same machine.
+"""
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+from optparse import OptionParser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from corpus import load_samples, make_page
+from readability import Document
+from readability.stats import Stats
+
+METHODS = ['summary', 'title', 'short_title']
+
+# name: (number of pages, make_page() arguments), None for the samples.
+CASES = {
+    'samples': None,
+    'small': (40, dict(size=10000)),
+    'medium': (15, dict(size=100000)),
+    'large': (3, dict(size=1000000)),
+    'deep': (10, dict(size=50000, depth=60)),
+    'links': (10, dict(size=50000, link_density=0.6)),
+}
+
+# metric: True if higher is better
+METRICS = {
+    'docs_per_s': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'peak_rss_mb': False,
+}
+
+
+def corpus(case):
+    if CASES[case] is None:
+        return load_samples()
+    count, arguments = CASES[case]
+    return [('%s-%d' % (case, seed), make_page(seed=seed, **arguments))
+            for seed in range(count)]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_case(case, repeat, stages=False):
+    pages = corpus(case)
+    options = {}
+    if stages:
+        stats = options['stats'] = Stats(count_nodes=False)
+    latencies = []
+    method_times = dict((method, 0.0) for method in METHODS)
+    start = time.time()
+    for _ in range(repeat):
+        for name, html in pages:
+            document_time = 0.0
+            for method in METHODS:
+                method_start = time.time()
+                getattr(Document(html, **options), method)()
+                elapsed = time.time() - method_start
+                method_times[method] += elapsed
+                document_time += elapsed
+            latencies.append(document_time)
+    total = time.time() - start
+    runs = len(latencies)
+    size = sum(len(html) for name, html in pages) * repeat
+    # ru_maxrss is in kilobytes on Linux, in bytes on Mac OS X.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss /= 1024
+    result = {
+        'docs': runs,
+        'kb_per_doc': size / 1024.0 / runs,
+        'docs_per_s': runs / total,
+        'mb_per_s': size / 1024.0 / 1024 / total,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'peak_rss_mb': rss / 1024.0,
+    }
+    for method in METHODS:
+        result['%s_ms' % method] = method_times[method] * 1000 / runs
+    if stages:
+        result['stages_ms'] = dict(
+            (name, elapsed * 1000 / runs)
+            for name, elapsed in stats.totals().items())
+    return result
+
+
+def run_isolated(case, repeat, stages=False):
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(run_case, (case, repeat, stages))
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def report(results, out=sys.stdout):
+    columns = ['docs', 'kb_per_doc', 'docs_per_s', 'mb_per_s', 'p50_ms',
+               'p90_ms', 'p99_ms', 'max_ms'] + \
+              ['%s_ms' % method for method in METHODS] + ['peak_rss_mb']
+    out.write('%-8s' % 'case' + ''.join('%15s' % c for c in columns) + '\n')
+    for case in sorted(results):
+        out.write('%-8s' % case + ''.join(
+            '%15.2f' % results[case][c] for c in columns) + '\n')
+    staged = [case for case in sorted(results) if 'stages_ms' in results[case]]
+    if not staged:
+        return
+    names = sorted(set(name for case in staged
+                       for name in results[case]['stages_ms']))
+    out.write('\nms per document and stage\n%-8s' % 'case' +
+              ''.join('%17s' % name for name in names) + '\n')
+    for case in staged:
+        out.write('%-8s' % case + ''.join(
+            '%17.2f' % results[case]['stages_ms'].get(name, 0)
+            for name in names) + '\n')
+
+
+def compare(results, baseline, threshold, out=sys.stdout):
+    """Report the metrics worse than the baseline by more than threshold,
+    and return how many there were."""
+    regressions = 0
+    for case in sorted(results):
+        if case not in baseline:
+            continue
+        for metric, higher_is_better in sorted(METRICS.items()):
+            old, new = baseline[case][metric], results[case][metric]
+            if not old:
+                continue
+            change = (new - old) / float(old)
+            if higher_is_better:
+                change = -change
+            if change > threshold:
+                regressions += 1
+                out.write('REGRESSION %s %s: %.2f -> %.2f (%+.1f%%)\n' % (
+                    case, metric, old, new, change * 100))
+    return regressions
+
+
+def main():
+    parser = OptionParser(usage="%prog: [options] [case ...]")
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help="times every page is processed")
+    parser.add_option('-b', '--baseline',
+                      default=os.path.join(HERE, 'baseline.json'),
+                      help="baseline file to compare with or save to")
+    parser.add_option('-s', '--save', action='store_true',
+                      help="save the results as the baseline")
+    parser.add_option('--stages', action='store_true',
+                      help="report the time spent in every pipeline stage")
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+                      help="relative change counted as a regression")
+    (options, args) = parser.parse_args()
+
+    cases = args or sorted(CASES)
+    for case in cases:
+        if case not in CASES:
+            parser.error("unknown case %s, choose from %s" % (
+                case, ', '.join(sorted(CASES))))
+
+    results = {}
+    for case in cases:
+        results[case] = run_isolated(case, options.repeat, options.stages)
+    report(results)
+
+    if options.save:
+        with open(options.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, options.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Deterministic pages for the benchmarks.
+
+make_page() builds a news-like page, with the site chrome (header,
+navigation, sidebar, comments, footer) around an article, so the whole
+extraction pipeline gets exercised.  The same arguments always give the
+same page.
+"""
+import os
+import random
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'samples')
+
+WORDS = (
+    'the of and to in a is that for it as was with be by on not he this are '
+    'or his from at which but have an they you were her she there been one '
+    'all we their has would when if so no will more what up out about into '
+    'than them can only other time new some could these two may first then '
+    'do any like my now over such our man me even most made after also did '
+    'many before must through back years where much your way well down '
+    'should because each just those people how too little state good very '
+    'make world still own see men work long get here between both life '
+    'being under never day same another know while last might us great old '
+    'year off come since against go came right used take three').split()
+
+BOILERPLATE_CLASSES = ['nav', 'menu', 'sidebar', 'footer', 'comment',
+                       'related', 'share', 'sponsor', 'widget', 'promo']
+CONTENT_CLASSES = ['article', 'content', 'story', 'post', 'entry', 'main',
+                   'text', 'body', 'column', 'wrapper']
+
+
+class PageMaker(object):
+
+    def __init__(self, seed, link_density):
+        self.random = random.Random(seed)
+        self.link_density = link_density
+
+    def words(self, count):
+        choice = self.random.choice
+        return ' '.join(choice(WORDS) for _ in range(count))
+
+    def link(self, count):
+        return '<a href="/%s/%d.html">%s</a>' % (
+            self.random.choice(WORDS), self.random.randint(1, 99999),
+            self.words(count))
+
+    def sentence(self):
+        r = self.random
+        parts = []
+        for _ in range(r.randint(1, 4)):
+            if r.random() < self.link_density:
+                parts.append(self.link(r.randint(1, 4)))
+            else:
+                parts.append(self.words(r.randint(4, 14)))
+        return ', '.join(parts).capitalize() + '.'
+
+    def paragraph(self):
+        return '<p>%s</p>\n' % ' '.join(
+            self.sentence() for _ in range(self.random.randint(2, 6)))
+
+    def nested(self, html, depth, classes):
+        r = self.random
+        for _ in range(depth):
+            html = '<div class="%s">\n%s</div>\n' % (r.choice(classes), html)
+        return html
+
+    def link_list(self, items):
+        return '<ul>%s</ul>\n' % ''.join(
+            '<li>%s</li>' % self.link(self.random.randint(1, 4))
+            for _ in range(items))
+
+    def chrome(self, name):
+        r = self.random
+        html = self.link_list(r.randint(5, 15))
+        if r.random() < 0.5:
+            html += '<p>%s</p>' % self.words(r.randint(5, 20))
+        return '<div class="%s" id="%s-%d">%s</div>\n' % (
+            name, name, r.randint(1, 9), html)
+
+    def article(self, size, depth):
+        r = self.random
+        body = []
+        length = 0
+        while length < size:
+            if r.random() < 0.1:
+                block = '<h2>%s</h2>\n' % self.words(r.randint(3, 8))
+            elif r.random() < 0.05:
+                block = ('<div class="image"><img src="/img/%d.jpg" '
+                         'width="600" height="400"><span>%s</span></div>\n' %
+                         (r.randint(1, 9999), self.words(6)))
+            elif r.random() < 0.05:
+                block = '<table><tr><td>%s</td><td>%s</td></tr></table>\n' % (
+                    self.words(5), self.words(5))
+            else:
+                block = self.paragraph()
+            if r.random() < 0.2:
+                block = self.nested(block, r.randint(1, max(1, depth // 4)),
+                                    CONTENT_CLASSES)
+            body.append(block)
+            length += len(block)
+        return self.nested(''.join(body), depth, CONTENT_CLASSES)
+
+    def comments(self):
+        r = self.random
+        return '<div class="comments">%s</div>\n' % ''.join(
+            '<div class="comment"><b>%s</b><p>%s</p></div>' % (
+                self.words(2), self.words(r.randint(5, 40)))
+            for _ in range(r.randint(3, 20)))
+
+    def page(self, size, depth):
+        title = self.words(self.random.randint(4, 10)).title()
+        head = ('<head><title>%s | The Daily Site</title>'
+                '<meta name="description" content="%s">'
+                '<meta property="og:title" content="%s">'
+                '<script>var page = {"id": %d, "html": "<div></div>"};'
+                '</script><style>p { margin: 0 }</style></head>\n') % (
+            title, self.words(20), title, self.random.randint(1, 9999))
+        body = ''.join([
+            '<header class="header">%s</header>\n' % self.link_list(8),
+            self.chrome('nav'),
+            '<div class="page">\n',
+            self.chrome('sidebar'),
+            '<h1 class="title">%s</h1>\n' % title,
+            self.article(size, depth),
+            self.comments(),
+            self.chrome('related'),
+            '</div>\n',
+            '<footer>%s</footer>\n' % self.link_list(10),
+        ])
+        return '<!DOCTYPE html>\n<html>%s<body>\n%s</body></html>\n' % (
+            head, body)
+
+
+def make_page(seed=0, size=20000, depth=4, link_density=0.1):
+    """Generate a page.
+
+    :param seed: pages differ by seed only.
+    :param size: approximate length of the article text and markup.
+    :param depth: number of <div>s wrapping the article.
+    :param link_density: probability for a sentence fragment to be a link.
+    """
+    return PageMaker(seed, link_density).page(size, depth)
+
+
+def load_samples():
+    """(name, html) for the pages checked in under tests/samples"""
+    pages = []
+    for name in sorted(os.listdir(SAMPLES)):
+        with open(os.path.join(SAMPLES, name), 'rb') as f:
+            pages.append((name, f.read()))
+    return pages
@@ -1 +1,3 @@
 from .readability import Document
+from .batch import extract_batch
+from .result import extract
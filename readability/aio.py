@@ -0,0 +1,127 @@
+"""
+Extraction for asyncio code, from pages arriving as a stream of chunks.
+
+    extractor = AsyncExtractor(max_concurrency=8)
+    summary = await extractor.summary(response.content.iter_chunked(65536),
+                                      url=url)
+
+The chunks are fed to an lxml feed parser as they arrive, and both the
+parsing and the scoring run in threads so the event loop is never
+blocked.  lxml parsers must stay in the thread they were used in, so every
+document is parsed in a thread of its own.  At most max_concurrency
+documents are read and processed at a time; the others wait before
+consuming their stream.
+"""
+import asyncio
+import codecs
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree
+import lxml.html
+
+from .encoding import get_encoding
+from .readability import Document
+
+# Bytes gathered to guess the encoding when none is given.
+SNIFF_SIZE = 64 * 1024
+READ_SIZE = 64 * 1024
+
+
+async def _iter_chunks(stream):
+    if hasattr(stream, '__aiter__') and not hasattr(stream, 'read'):
+        async for chunk in stream:
+            yield chunk
+    else:
+        # asyncio.StreamReader and the like: iterating them gives lines.
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class AsyncExtractor(object):
+    """Runs Document extraction for async byte streams.
+
+    :param max_concurrency: documents processed at the same time.
+    :param executor: a concurrent.futures executor for the parsing and
+      scoring, the loop's default executor if None.
+    """
+
+    def __init__(self, max_concurrency=4, executor=None):
+        self.executor = executor
+        self.limiter = asyncio.Semaphore(max_concurrency)
+
+    async def _run(self, func, *args, executor=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor or self.executor, func,
+                                          *args)
+
+    async def parse(self, stream, encoding=None):
+        """Parse the chunks of an async iterable or stream reader.
+
+        Chunks may be bytes, decoded with the given encoding or the one
+        guessed from the first SNIFF_SIZE bytes, or already decoded str.
+        """
+        thread = ThreadPoolExecutor(max_workers=1)
+        try:
+            return await self._parse(stream, encoding, thread)
+        finally:
+            thread.shutdown(wait=False)
+
+    async def _parse(self, stream, encoding, thread):
+        run = functools.partial(self._run, executor=thread)
+        parser = await run(functools.partial(lxml.html.HTMLParser,
+                                             encoding='utf-8'))
+        decoder = None
+        pending = []
+        pending_size = 0
+        async for chunk in _iter_chunks(stream):
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                await run(parser.feed, chunk.encode('utf-8', 'replace'))
+                continue
+            if decoder is None and encoding is None:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size < SNIFF_SIZE:
+                    continue
+                chunk = b''.join(pending)
+                pending = []
+                encoding = get_encoding(chunk)
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)('replace')
+            await run(self._feed, parser, decoder, chunk, False)
+        if pending:
+            chunk = b''.join(pending)
+            decoder = codecs.getincrementaldecoder(
+                encoding or get_encoding(chunk))('replace')
+            await run(self._feed, parser, decoder, chunk, True)
+        elif decoder is not None:
+            await run(self._feed, parser, decoder, b'', True)
+        try:
+            return await run(parser.close)
+        except lxml.etree.XMLSyntaxError:
+            raise lxml.etree.ParserError('Document is empty')
+
+    @staticmethod
+    def _feed(parser, decoder, chunk, final):
+        # Same decoding as htmls.build_doc(), done a chunk at a time.
+        parser.feed(decoder.decode(chunk, final).encode('utf-8', 'replace'))
+
+    async def document(self, stream, encoding=None, **options):
+        """Parse the stream into a Document, the rest of the work being
+        done when calling its methods."""
+        tree = await self.parse(stream, encoding=encoding)
+        return Document(tree, **options)
+
+    async def summary(self, stream, html_partial=False, encoding=None,
+                      **options):
+        """Summary of the page read from stream, see Document.summary()"""
+        async with self.limiter:
+            doc = await self.document(stream, encoding=encoding, **options)
+            return await self._run(
+                functools.partial(doc.summary, html_partial=html_partial))
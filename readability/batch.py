@@ -0,0 +1,288 @@
+"""
+Extraction of many documents at once, spread over a pool of processes.
+
+    from readability import extract_batch
+    for result in extract_batch(pages, processes=8, timeout=5):
+        print(result.index, result.title, result.error)
+
+Every item is either the html of a page or an (html, options) pair, where
+options are the Document() keyword arguments plus html_partial for
+summary(), and None stands for a page that could not be read.  Failures
+are reported on the item's result instead of being raised, so one bad
+page never stops the batch.
+"""
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from collections import namedtuple
+
+from .readability import Document
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+BatchResult = namedtuple('BatchResult', [
+    'index', 'summary', 'title', 'short_title', 'error', 'elapsed'])
+
+
+# Seconds between checks for chunks whose worker was lost.
+EXPIRE_INTERVAL = 1.0
+
+
+class DocumentTimeout(BaseException):
+    # Not an Exception: the broad except clauses in Document.summary()
+    # must not turn an expired timeout into an ordinary parse error.
+    pass
+
+
+def _timed_out(signum, frame):
+    raise DocumentTimeout()
+
+
+def extract(index, item, timeout=None):
+    """Extract a single batch item, catching any error"""
+    if isinstance(item, (tuple, list)):
+        html, options = item
+        options = dict(options or {})
+    else:
+        html, options = item, {}
+    html_partial = options.pop('html_partial', False)
+    options.setdefault('parse_once', True)
+    if html is None:
+        return BatchResult(index, None, None, None, 'no html', 0.0)
+
+    alarm = timeout and hasattr(signal, 'setitimer')
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _timed_out)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.time()
+    summary = title = short_title = error = None
+    try:
+        doc = Document(html, **options)
+        summary = doc.summary(html_partial=html_partial)
+        title = doc.title()
+        short_title = doc.short_title()
+    except DocumentTimeout:
+        summary = title = short_title = None
+        error = 'DocumentTimeout: took longer than %ss' % timeout
+    except Exception as e:
+        summary = title = short_title = None
+        error = '%s: %s' % (e.__class__.__name__, e)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return BatchResult(index, summary, title, short_title, error,
+                       time.time() - start)
+
+
+def _extract_chunk(chunk, timeout):
+    return [extract(index, item, timeout) for index, item in chunk]
+
+
+def _chunks(items, chunksize):
+    chunk = []
+    for index, item in enumerate(items):
+        chunk.append((index, item))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_batch(items, processes=None, chunksize=1, timeout=None,
+                  ordered=True, maxtasksperchild=None, result_timeout=300):
+    """Extract the summary, title and short title of many documents.
+
+    :param items: iterable of html strings or (html, options) pairs, only
+      read as fast as the workers get through it.
+    :param processes: number of worker processes, the number of CPUs by
+      default.
+    :param chunksize: number of items sent to a worker at a time.
+    :param timeout: seconds allowed per document, on platforms that have
+      SIGALRM.  Documents running over get a DocumentTimeout error.
+    :param ordered: yield results in input order rather than as soon as
+      they are done.
+    :param maxtasksperchild: replace a worker after it has processed this
+      many chunks, to give back the memory lxml holds on to.
+    :param result_timeout: seconds a chunk sent to a worker waits for its
+      results, in case the worker died, before its items get a WorkerLost
+      error.
+
+    Yields a BatchResult per item, whose index is the item's position.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes, maxtasksperchild=maxtasksperchild)
+    done = queue.Queue()
+    try:
+        chunks = enumerate(_chunks(items, chunksize))
+        # Keep every worker busy without reading all the input up front.
+        # Chunks held back to be yielded in order count as pending too.
+        max_pending = processes * 2
+        # chunks sent to the workers, by number: (deadline, chunk)
+        pending = {}
+        finished = {}
+        next_chunk = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) + len(finished) < max_pending:
+                try:
+                    number, chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[number] = (time.time() + result_timeout, chunk)
+                pool.apply_async(
+                    _extract_chunk, (chunk, timeout),
+                    callback=lambda results, number=number:
+                        done.put((number, results, None)),
+                    error_callback=lambda error, number=number:
+                        done.put((number, None, _error(error))))
+            if not pending:
+                break
+            try:
+                answers = [done.get(timeout=EXPIRE_INTERVAL)]
+            except queue.Empty:
+                # A worker killed in the middle of a chunk never calls back.
+                now = time.time()
+                answers = [(number, None, 'WorkerLost: no result within %s'
+                            ' seconds' % result_timeout)
+                           for number, (deadline, chunk)
+                           in sorted(pending.items()) if deadline < now]
+            for number, results, error in answers:
+                if number not in pending:
+                    # given up on already
+                    continue
+                deadline, chunk = pending.pop(number)
+                if error is not None:
+                    # The chunk never made it through a worker (e.g. an
+                    # item that can't be pickled), so report it on every
+                    # item.
+                    results = [BatchResult(index, None, None, None, error,
+                                           0.0)
+                               for index, item in chunk]
+                if not ordered:
+                    for result in results:
+                        yield result
+                    continue
+                finished[number] = results
+                while next_chunk in finished:
+                    for result in finished.pop(next_chunk):
+                        yield result
+                    next_chunk += 1
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_paths(patterns):
+    """Files named by patterns, which may be paths, directories or globs.
+    A pattern matching nothing is given as it is, for iter_files() to
+    report."""
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.exists(pattern):
+            yield pattern
+        else:
+            paths = [path for path in sorted(glob.iglob(pattern))
+                     if os.path.isfile(path)]
+            for path in paths or [pattern]:
+                yield path
+
+
+def _error(e):
+    return '%s: %s' % (e.__class__.__name__, e)
+
+
+def iter_jsonl(lines):
+    """(record, html) for every JSON line holding an html key, and a url.
+    An invalid line gives a record with its number and the error."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('not a JSON object')
+        except ValueError as e:
+            yield {'url': None, 'line': number, 'error': _error(e)}, None
+            continue
+        html = record.pop('html', None) or ''
+        yield {'url': record.get('url')}, html
+
+
+def iter_files(paths):
+    """(record, html) for every file, a file that can't be read giving a
+    record with the error"""
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                html = f.read()
+        except (IOError, OSError) as e:
+            yield {'path': path, 'error': _error(e)}, None
+            continue
+        yield {'path': path}, html
+
+
+def stream(sources, out=None, progress=None, options=None,
+           report_every=1.0, **batch_options):
+    """Extract (record, html) sources, writing one JSON line per document
+    to out as the results come, and a throughput report to progress.
+
+    Only the documents being worked on are kept in memory.  Returns the
+    number of documents and of errors.
+    """
+    out = out or sys.stdout
+    options = options or {}
+    records = {}
+
+    def items():
+        for index, (record, html) in enumerate(sources):
+            records[index] = record
+            item_options = dict(options)
+            if record.get('url'):
+                item_options['url'] = record['url']
+            yield html, item_options
+
+    start = last_report = time.time()
+    count = errors = 0
+    for result in extract_batch(items(), **batch_options):
+        line = records.pop(result.index)
+        if line.get('error'):
+            # the record could not be read
+            line.update(summary=None, title=None, short_title=None,
+                        elapsed=0.0)
+        else:
+            line.update(summary=result.summary, title=result.title,
+                        short_title=result.short_title, error=result.error,
+                        elapsed=round(result.elapsed, 6))
+        out.write(json.dumps(line) + '\n')
+        count += 1
+        if line['error']:
+            errors += 1
+        now = time.time()
+        if progress is not None and now - last_report >= report_every:
+            last_report = now
+            progress.write('\r%d documents, %.1f/s, %d errors' % (
+                count, count / (now - start), errors))
+            progress.flush()
+    out.flush()
+    if progress is not None:
+        elapsed = time.time() - start
+        progress.write('\r%d documents in %.2fs, %.1f/s, %d errors\n' % (
+            count, elapsed, count / max(elapsed, 1e-9), errors))
+    return count, errors
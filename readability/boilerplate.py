@@ -0,0 +1,113 @@
+"""
+Blocks recurring across the pages of a site, such as navigation, footers,
+related links or newsletter forms, found by their fingerprints and pruned
+before scoring.
+
+    index = BoilerplateIndex(threshold=0.5)
+    for url, html in pages:
+        Document(html, url=url, boilerplate=index).summary()
+
+A fingerprint hashes the tag and class of a block, its text with spaces
+normalized and the fingerprints of its children, so a block only matches
+one with the same text and structure.  Fingerprints are Python hashes: an
+index is only meaningful within one process.
+"""
+import lxml.etree
+
+from .lru import LRUCache
+from .shared import ProcessShared
+
+BLOCK_TAGS = frozenset(['div', 'section', 'article', 'aside', 'nav',
+                        'header', 'footer', 'ul', 'ol', 'dl', 'table',
+                        'form', 'p'])
+
+
+def _normalize(text):
+    return ' '.join(text.split()) if text else ''
+
+
+def fingerprint_blocks(root):
+    """(element, fingerprint) of the blocks with text under root, in a
+    single pass, children before their parents"""
+    fingerprints = {}
+    has_text = {}
+    blocks = []
+    # reversed document order has every child before its parent
+    for elem in reversed(list(root.iter(lxml.etree.Element))):
+        text = _normalize(elem.text)
+        parts = [elem.tag, elem.get('class', ''), text]
+        texty = bool(text)
+        for child in elem.iterchildren(lxml.etree.Element):
+            tail = _normalize(child.tail)
+            parts.append(fingerprints.pop(child))
+            parts.append(tail)
+            texty = has_text.pop(child) or texty or bool(tail)
+        fingerprint = hash(tuple(parts))
+        fingerprints[elem] = fingerprint
+        has_text[elem] = texty
+        if texty and elem.tag in BLOCK_TAGS:
+            blocks.append((elem, fingerprint))
+    return blocks
+
+
+class BoilerplateIndex(ProcessShared):
+    """Counts of the pages every block was seen on, per domain.
+
+    :param threshold: fraction of a domain's pages a block must be on to be
+      boilerplate.
+    :param min_documents: pages of a domain seen before pruning any.
+    :param max_blocks: fingerprints kept per domain; the least seen are
+      forgotten first.  As many page fingerprints are kept, a page seen
+      again being counted only once.
+    :param max_domains: domains kept, the most recently seen.
+    """
+
+    def __init__(self, threshold=0.5, min_documents=10, max_blocks=20000,
+                 max_domains=1000):
+        self.threshold = threshold
+        self.min_documents = min_documents
+        self.max_blocks = max_blocks
+        self.max_domains = max_domains
+        self._domains = LRUCache(max_domains)
+
+    def settings(self):
+        return {'threshold': self.threshold,
+                'min_documents': self.min_documents,
+                'max_blocks': self.max_blocks,
+                'max_domains': self.max_domains}
+
+    def add(self, domain, fingerprints):
+        """Count the blocks of one page of domain, unless the same page was
+        already counted"""
+        site = self._domains.get(domain)
+        if site is None:
+            site = {'documents': 0, 'counts': {},
+                    'pages': LRUCache(self.max_blocks)}
+            self._domains.set(domain, site)
+        page = hash(tuple(fingerprints))
+        if page in site['pages']:
+            return
+        site['pages'].set(page, True)
+        site['documents'] += 1
+        counts = site['counts']
+        for fingerprint in set(fingerprints):
+            counts[fingerprint] = counts.get(fingerprint, 0) + 1
+        if len(counts) > self.max_blocks:
+            kept = sorted(counts.items(), key=lambda item: item[1],
+                          reverse=True)[:self.max_blocks // 2]
+            site['counts'] = dict(kept)
+
+    def documents(self, domain):
+        site = self._domains.get(domain)
+        return site['documents'] if site else 0
+
+    def recurring(self, domain, fingerprints):
+        """The fingerprints that are boilerplate on domain"""
+        site = self._domains.get(domain)
+        if site is None or site['documents'] < self.min_documents:
+            return set()
+        # a block seen once is never boilerplate, whatever the threshold
+        least = max(self.threshold * site['documents'], 1)
+        counts = site['counts']
+        return set(fingerprint for fingerprint in fingerprints
+                   if counts.get(fingerprint, 0) > least)
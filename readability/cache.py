@@ -0,0 +1,149 @@
+"""
+Results of summary(), title() and short_title() kept by the hash of the
+input and of the options changing them, so pages seen before cost a hash
+and a lookup.
+
+    cache = ResultCache(maxsize=10000, store=SQLiteStore('results.db'))
+    summary = Document(html, url=url, cache=cache).summary()
+    print(cache.hits, cache.misses)
+
+The store, when given, is shared by every process using the same file,
+e.g. the workers of readability.batch.extract_batch().  A cache sent to
+such a worker is the same object for every document it processes there.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+
+from lxml.etree import iselement
+
+from .lru import LRUCache
+from .shared import ProcessShared
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+# Document options the results depend on.
+KEY_OPTIONS = ['url', 'domain', 'min_text_length', 'retry_length', 'charset',
+               'attributes', 'regex_clean_attributes', 'max_bytes',
+               'max_nodes', 'inject_meta']
+
+# Document options whose results depend on the pages seen before, and which
+# must see every page: documents given them are never cached.
+STATEFUL_OPTIONS = ['boilerplate', 'templates']
+
+
+def input_digest(input):
+    """Hash of the html, or None for an already parsed tree"""
+    if iselement(input):
+        return None
+    if not isinstance(input, bytes):
+        if hasattr(input, 'encode'):
+            input = input.encode('utf-8', 'surrogatepass')
+        else:
+            input = bytes(input)
+    if xxhash is not None:
+        return 'xxh3-' + xxhash.xxh3_128_hexdigest(input)
+    return 'blake2b-' + hashlib.blake2b(input, digest_size=16).hexdigest()
+
+
+def result_key(digest, options, method, html_partial=False):
+    return '%s %s %d %r' % (digest, method, html_partial, tuple(
+        options.get(name, None) for name in KEY_OPTIONS))
+
+
+class SQLiteStore(object):
+    """Results in an SQLite database, which processes can share.
+
+    Every process opens its own connection, on first use.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'path': self.path, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS results '
+                               '(key TEXT PRIMARY KEY, value TEXT)')
+            connection.commit()
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        with self._lock:
+            connection = self._connect()
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?)',
+                               (key, value))
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class ResultCache(ProcessShared):
+    """The most recently used results in memory, and all of them in store
+    if given.
+
+    :param maxsize: number of results kept in memory.
+    :param store: an object with get(key) and set(key, value) methods, such
+      as SQLiteStore, looked into when a result isn't in memory.
+
+    hits and misses count the lookups of this process.
+    """
+
+    def __init__(self, maxsize=1024, store=None):
+        self.memory = LRUCache(maxsize)
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def settings(self):
+        return {'maxsize': self.memory.maxsize, 'store': self.store}
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
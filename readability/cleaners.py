@@ -1,5 +1,6 @@
 # strip out a set of nuisance html attributes that can mess up rendering in RSS feeds
 import re
+from lxml import etree
 from lxml.html.clean import Cleaner
 
 bad_attrs = ['width', 'height', '[-a-z]*color', 'background[-a-z]*', 'on*']
@@ -19,6 +20,24 @@ def clean_attributes(html):
         html = htmlstrip.sub('<\\1\\2>', html)
     return html
 
+bad_attr_names = re.compile('(?:%s)$' % '|'.join(bad_attrs), re.I)
+
+def strip_bad_attributes(doc):
+    """Remove from the tree, in one pass, the attributes clean_attributes()
+    removes from its serialization: the bad_attrs with a non-empty value"""
+    for elem in doc.iter(etree.Element):
+        attrib = elem.attrib
+        if not attrib:
+            continue
+        for name in [name for name, value in attrib.items()
+                     if value and bad_attr_names.match(name)]:
+            del attrib[name]
+
+def clean(text):
+    text = re.sub(r'\s*\n\s*', '\n', text)
+    text = re.sub(r'[ \t]{2,}', ' ', text)
+    return text.strip()
+
 def normalize_spaces(s):
     if not s: return ''
     """replace any sequence of whitespace
@@ -30,3 +49,16 @@ html_cleaner = Cleaner(scripts=True, javascript=True, comments=True,
                   page_structure=False, processing_instructions=True, embedded=False,
                   frames=False, forms=True, annoying_tags=False, remove_tags=None,
                   remove_unknown_tags=False, safe_attrs_only=False, kill_tags=["noscript"])
+
+# What html_cleaner drops along with its content, and what it drops keeping
+# its content, as far as the text of the page goes.
+killed_tags = ('script', 'noscript', 'link', 'button', 'input', 'select',
+               'textarea', etree.Comment, etree.ProcessingInstruction)
+removed_tags = ('form',)
+
+def clean_text(doc):
+    """Drop from doc what html_cleaner would drop from its text, without
+    the rest of its cleaning"""
+    etree.strip_elements(doc, *killed_tags, with_tail=False)
+    etree.strip_tags(doc, *removed_tags)
+    return doc
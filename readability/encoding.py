@@ -1,9 +1,119 @@
+import codecs
 import re
 import chardet
 
-def get_encoding(page):
-    text = re.sub(b'</?[^>]*>\s*', b' ', page)
+# Bytes searched for a <meta> or <?xml?> charset declaration.
+DECLARATION_SIZE = 8192
+# Bytes used to check an encoding decodes the page, and given to detectors.
+SAMPLE_SIZE = 65536
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+DECLARATIONS = [
+    re.compile(br'<meta[^>]*?charset\s*=\s*["\']?\s*([-\w.:]+)', re.I),
+    re.compile(br'<\?xml[^>]*?encoding\s*=\s*["\']\s*([-\w.:]+)', re.I),
+]
+
+# Declared or detected names, and the codec to use instead.
+CHARSETS = {
+    'maccyrillic': 'cp1251',
+    'x-mac-cyrillic': 'cp1251',
+    'win-1251': 'cp1251',
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'big5': 'big5hkscs',
+    'ascii': 'utf-8',
+    'us-ascii': 'utf-8',
+}
+
+
+def fix_charset(encoding):
+    """Codec name to decode a page declared or detected as encoding, or
+    None if Python doesn't know it."""
+    if not encoding:
+        return None
+    if not isinstance(encoding, str):
+        encoding = encoding.decode('ascii', 'replace')
+    encoding = encoding.strip().lower()
+    encoding = CHARSETS.get(encoding, encoding)
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def decodes(sample, encoding):
+    """Whether the sample is valid in encoding, allowing for a character
+    cut at its end."""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, False)
+    except (UnicodeError, LookupError):
+        # UnicodeError for a UTF-16 or UTF-32 stream without a BOM
+        return False
+    return True
+
+
+def is_ascii(sample):
+    try:
+        sample.decode('ascii')
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def chardet_detector(text):
+    return chardet.detect(text)['encoding']
+
+
+# Called in turn with a sample of the page text until one returns an
+# encoding; put a faster detector first to use it instead of chardet.
+DETECTORS = [chardet_detector]
+
+
+def get_encoding(page, charset=None, detectors=None):
+    """Guess the encoding of a page.
+
+    :param page: the bytes of the page, or any bytes-like object.
+    :param charset: the charset given by the transport, e.g. the
+      Content-Type HTTP header, used when the page decodes with it.
+    :param detectors: callables replacing DETECTORS.
+
+    A BOM comes first, then the given charset and the charset declared in
+    the head of the page, then a UTF-8 check and the detectors, all of which
+    only look at the start of the page.
+    """
     enc = 'utf-8'
+    sample = bytes(page[:SAMPLE_SIZE])
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    head = sample[:DECLARATION_SIZE]
+    declared = [charset] + [m.group(1) for regexp in DECLARATIONS
+                            for m in regexp.finditer(head)]
+    for number, encoding in enumerate(declared):
+        encoding = fix_charset(encoding)
+        # A declaration readable as ASCII can't be in UTF-16 or UTF-32:
+        # the HTML spec reads such pages as UTF-8.
+        if number > 0 and encoding is not None and \
+                encoding.startswith(('utf-16', 'utf-32')):
+            encoding = 'utf-8'
+        if encoding is None or not decodes(sample, encoding):
+            continue
+        # Pages declared in a legacy charset are often UTF-8, and text in a
+        # legacy charset is very rarely valid UTF-8 once it isn't ASCII.
+        if encoding != 'utf-8' and not is_ascii(sample) and \
+                decodes(sample, 'utf-8'):
+            return enc
+        return encoding
+
+    text = re.sub(br'</?[^>]*>\s*', b' ', sample)
     if not text.strip() or len(text) < 10:
         return enc # can't guess
     try:
@@ -13,11 +123,8 @@ def get_encoding(page):
             return enc
     except UnicodeDecodeError:
         pass
-    res = chardet.detect(text)
-    enc = res['encoding']
-    #print('->', enc, "%.2f" % res['confidence'])
-    if enc == 'MacCyrillic':
-        enc = 'cp1251'
-    if enc == None:
-        enc = "utf-8"
+    for detector in (DETECTORS if detectors is None else detectors):
+        encoding = fix_charset(detector(text))
+        if encoding is not None:
+            return encoding
     return enc
@@ -1,7 +1,10 @@
-from .cleaners import normalize_spaces, clean_attributes
+from .cleaners import normalize_spaces, clean_attributes, strip_bad_attributes
+from .cleaners import killed_tags
 from .encoding import get_encoding
 from lxml.html import tostring
+import codecs
 import logging
+import lxml.etree
 import lxml.html
 import re
 
@@ -11,16 +14,115 @@ if sys.version < '3':
     str = unicode
 
 utf8_parser = lxml.html.HTMLParser(encoding='utf-8')
+# Leaves out the comments and processing instructions html_cleaner drops.
+utf8_lean_parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True,
+                                        remove_pis=True)
 
-def build_doc(page):
+TITLE_CHUNK_SIZE = 8192
+
+def parse_bytes(page, encoding, lean=False):
+    """Parse the page bytes, lxml decoding them as it goes.
+
+    Returns None if lxml doesn't know the encoding, or finds bytes invalid
+    in it, as it may not replace them the way Python does.
+    """
+    try:
+        parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=lean,
+                                      remove_pis=lean)
+    except LookupError:
+        return None
+    doc = lxml.html.document_fromstring(page, parser=parser)
+    for error in parser.error_log:
+        if 'ENCODING' in error.type_name or error.domain_name == 'I18N':
+            return None
+    return doc
+
+def build_doc(page, charset=None, lean=False):
+    """Parse the page, a string or bytes.
+
+    :param lean: leave out the comments and processing instructions.
+    """
+    if lxml.etree.iselement(page):
+        # already parsed, e.g. incrementally by readability.aio
+        return page
     if isinstance(page, str):
         page_unicode = page
     else:
-        enc = get_encoding(page)
-        page_unicode = page.decode(enc, 'replace')
-    doc = lxml.html.document_fromstring(page_unicode.encode('utf-8', 'replace'), parser=utf8_parser)
+        enc = get_encoding(page, charset)
+        doc = parse_bytes(page, enc, lean)
+        if doc is not None:
+            return doc
+        page_unicode = codecs.decode(page, enc, 'replace')
+    doc = lxml.html.document_fromstring(page_unicode.encode('utf-8', 'replace'),
+                                        parser=utf8_lean_parser if lean else utf8_parser)
     return doc
 
+def _utf8_chunks(page, charset, size):
+    # Same decoding as build_doc() falls back to, a chunk at a time.
+    if isinstance(page, str):
+        for start in range(0, len(page), size):
+            yield page[start:start + size].encode('utf-8', 'replace')
+        return
+    decoder = codecs.getincrementaldecoder(get_encoding(page, charset))(
+        'replace')
+    for start in range(0, len(page), size):
+        yield decoder.decode(page[start:start + size]).encode('utf-8', 'replace')
+    yield decoder.decode(b'', True).encode('utf-8', 'replace')
+
+def _killed(elem):
+    return any(a.tag in killed_tags for a in elem.iterancestors())
+
+def parse_to_title(page, charset=None, shorten=False):
+    """Parse page incrementally, as build_doc() would, up to the end of the
+    title get_title() would find once the page is cleaned.
+
+    With shorten, the rest of the page is parsed too unless the title is too
+    short for shorten_title() to change.  The tree is not cleaned.
+    """
+    parser = lxml.etree.HTMLPullParser(events=('end',), tag='title',
+                                       encoding='utf-8')
+    parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+    title = None
+    for chunk in _utf8_chunks(page, charset, TITLE_CHUNK_SIZE):
+        parser.feed(chunk)
+        if title is None:
+            for _, elem in parser.read_events():
+                if not _killed(elem):
+                    title = elem
+                    break
+        if title is not None and not (shorten and _shortenable(title)):
+            break
+    try:
+        doc = parser.close()
+    except lxml.etree.XMLSyntaxError:
+        doc = None
+    if doc is None:
+        raise lxml.etree.ParserError('Document is empty')
+    return doc
+
+def truncate_tree(doc, max_nodes):
+    """Keep only the first max_nodes nodes of doc, in document order.
+
+    Returns whether any were dropped.
+    """
+    last = None
+    for count, node in enumerate(doc.iter(), 1):
+        if count == max_nodes:
+            last = node
+            break
+    if last is None:
+        return False
+    dropped = len(last) > 0
+    del last[:]
+    node = last
+    while node is not None:
+        parent = node.getparent()
+        while node.getnext() is not None:
+            parent.remove(node.getnext())
+            dropped = True
+        node = parent
+    return dropped
+
 def js_re(src, pattern, flags, repl):
     return re.compile(pattern, flags).sub(src, repl.replace('$', '\\'))
 
@@ -45,6 +147,10 @@ def normalize_entities(cur_title):
 def norm_title(title):
     return normalize_entities(normalize_spaces(title))
 
+def _shortenable(title):
+    # shorten_title() returns any title of 15 characters or less as it is
+    return bool(title.text) and len(norm_title(title.text)) > 15
+
 def get_title(doc):
     title = doc.find('.//title')
     if title is None or title.text is None or len(title.text) == 0:
@@ -58,6 +164,21 @@ def add_match(collection, text, orig):
         if text.replace('"', '') in orig.replace('"', ''):
             collection.add(text)
 
+def _title_candidates_xpath(tags, ids, classes):
+    # What the css selectors of tags, #ids and .classes match, in a single
+    # pass rather than one per selector.
+    tests = ['self::%s' % tag for tag in tags]
+    tests += ["@id = '%s'" % id for id in ids]
+    tests += ["(@class and contains(@class, '%s') and contains(concat(' ', "
+              "normalize-space(@class), ' '), ' %s '))" % (cls, cls)
+              for cls in classes]
+    return lxml.etree.XPath('descendant-or-self::*[%s]' % ' or '.join(tests))
+
+title_candidates = _title_candidates_xpath(
+    ['h1', 'h2', 'h3'], ['title', 'head', 'heading'],
+    ['pageTitle', 'news_title', 'title', 'head', 'heading', 'contentheading',
+     'small_header_red'])
+
 def shorten_title(doc):
     title = doc.find('.//title')
     if title is None or title.text is None or len(title.text) == 0:
@@ -67,19 +188,11 @@ def shorten_title(doc):
 
     candidates = set()
 
-    for item in ['.//h1', './/h2', './/h3']:
-        for e in list(doc.iterfind(item)):
-            if e.text:
-                add_match(candidates, e.text, orig)
-            if e.text_content():
-                add_match(candidates, e.text_content(), orig)
-
-    for item in ['#title', '#head', '#heading', '.pageTitle', '.news_title', '.title', '.head', '.heading', '.contentheading', '.small_header_red']:
-        for e in doc.cssselect(item):
-            if e.text:
-                add_match(candidates, e.text, orig)
-            if e.text_content():
-                add_match(candidates, e.text_content(), orig)
+    for e in title_candidates(doc):
+        if e.text:
+            add_match(candidates, e.text, orig)
+        if e.text_content():
+            add_match(candidates, e.text_content(), orig)
 
     if candidates:
         title = sorted(candidates, key=len)[-1]
@@ -106,9 +219,13 @@ def shorten_title(doc):
 
     return title
 
-def get_body(doc):
+def get_body(doc, regex_clean_attributes=False):
     [ elem.drop_tree() for elem in doc.xpath('.//script | .//link | .//style') ]
-    raw_html = str(tostring(doc.body or doc))
+    body = doc.body or doc
+    if not regex_clean_attributes:
+        strip_bad_attributes(body)
+        return str(tostring(body))
+    raw_html = str(tostring(body))
     cleaned = clean_attributes(raw_html)
     try:
         #BeautifulSoup(cleaned) #FIXME do we really need to try loading it?
@@ -116,3 +233,40 @@ def get_body(doc):
     except Exception: #FIXME find the equivalent lxml error
         logging.error("cleansing broke html content: %s\n---------\n%s" % (raw_html, cleaned))
         return raw_html
+
+# Tags starting a new paragraph of get_paragraphs().
+paragraph_tags = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd',
+    'div', 'dl', 'dt', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p',
+    'pre', 'section', 'table', 'td', 'th', 'tr', 'ul'])
+
+# Marks the paragraph boundaries in the text serialization, a Unicode
+# noncharacter that text has no reason to contain.
+paragraph_mark = u'\ufdd0'
+
+def get_paragraphs(node):
+    """Text of node split at its block elements, spaces normalized, with
+    the empty paragraphs left out.
+
+    The boundaries are marked in the tree for lxml to serialize the text
+    in one go, and the tree is restored afterwards.
+    """
+    saved = []
+    for elem in node.iter(*paragraph_tags):
+        saved.append((elem, elem.text, elem.tail))
+        elem.text = paragraph_mark + (elem.text or '')
+        elem.tail = paragraph_mark + (elem.tail or '')
+    try:
+        text = lxml.etree.tostring(node, method='text', encoding=str,
+                                   with_tail=False)
+    finally:
+        for elem, elem_text, tail in saved:
+            elem.text = elem_text
+            elem.tail = tail
+    paragraphs = []
+    for paragraph in text.split(paragraph_mark):
+        paragraph = normalize_spaces(paragraph)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
@@ -0,0 +1,62 @@
+"""
+A bounded mapping dropping its least recently used items, for the caches
+kept across documents.
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Holds up to maxsize items, counting hits and misses.
+
+    get() and set() need no lock: an item evicted by another thread in
+    between is simply missing.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        while len(self._data) > self.maxsize:
+            try:
+                self._data.popitem(last=False)
+            except KeyError:
+                break
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def items(self):
+        """(key, value) from the least to the most recently used"""
+        return list(self._data.items())
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
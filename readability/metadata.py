@@ -0,0 +1,136 @@
+"""
+Values of the meta tags, microdata and JSON-LD of a page.
+
+The meta tags and microdata are found together in one XPath traversal,
+and JSON-LD scripts kept aside while parsing, before the cleaner drops
+every script.
+"""
+import json
+import re
+
+import lxml.etree
+
+ARTICLE_TYPES = frozenset(['Article', 'NewsArticle', 'BlogPosting',
+                           'ReportageNewsArticle', 'ScholarlyArticle',
+                           'TechArticle', 'Report'])
+PRODUCT_TYPES = frozenset(['Product', 'ProductModel', 'IndividualProduct'])
+
+ARTICLE_FIELDS = ['headline', 'name', 'description', 'author', 'publisher',
+                  'datePublished', 'dateModified', 'articleSection',
+                  'keywords', 'image']
+PRODUCT_FIELDS = ['name', 'description', 'brand', 'model', 'sku', 'gtin13',
+                  'mpn', 'category', 'image']
+OFFER_FIELDS = ['price', 'priceCurrency', 'availability']
+
+_items_xpaths = {}
+
+
+def _items_xpath(badtags):
+    xpath = _items_xpaths.get(badtags)
+    if xpath is None:
+        outside = ' or '.join('ancestor::%s' % tag for tag in badtags)
+        xpath = lxml.etree.XPath(
+            './/meta[@name or @property] | .//*[@itemprop]%s'
+            % ('[not(%s)]' % outside if outside else ''))
+        _items_xpaths[badtags] = xpath
+    return xpath
+
+
+def meta_items(doc, metaprops, itemprops, badtags):
+    """((name or property, content) of the meta tags in metaprops,
+    (itemprop, content or text) of the elements in itemprops not within
+    badtags), both in document order"""
+    metaprops = frozenset(metaprops)
+    itemprops = frozenset(itemprops)
+    badtags = tuple(badtags)
+    metas = []
+    props = []
+    for elem in _items_xpath(badtags)(doc):
+        if elem.tag == 'meta':
+            prop = elem.get('name', elem.get('property', None))
+            if prop in metaprops:
+                metas.append((prop, elem.get('content')))
+        prop = elem.get('itemprop')
+        if prop not in itemprops:
+            continue
+        # a meta tag is found as such even within badtags
+        if elem.tag == 'meta' and badtags and any(
+                a.tag in badtags for a in elem.iterancestors()):
+            continue
+        content = elem.get('content')
+        if content is None:
+            content = elem.text_content().strip()
+        props.append((prop, content))
+    return metas, props
+
+
+def strip_tags(text):
+    return re.sub("<.*?>", '', text)
+
+
+def json_ld_scripts(doc):
+    """Texts of the JSON-LD scripts of doc"""
+    return [script.text for script in doc.iter('script')
+            if script.text and script.get('type', '').strip().lower() ==
+            'application/ld+json']
+
+
+def _json_ld_items(data):
+    if isinstance(data, list):
+        for item in data:
+            for found in _json_ld_items(item):
+                yield found
+    elif isinstance(data, dict):
+        yield data
+        for found in _json_ld_items(data.get('@graph', [])):
+            yield found
+
+
+def _types(item):
+    types = item.get('@type', [])
+    if not isinstance(types, list):
+        types = [types]
+    return set(t for t in types if not isinstance(t, (dict, list)))
+
+
+def _value(value):
+    """Names of things, urls of images, plain values as they are"""
+    if isinstance(value, list):
+        values = [_value(v) for v in value]
+        return [v for v in values if v is not None] or None
+    if isinstance(value, dict):
+        return value.get('name', value.get('url', value.get('@id', None)))
+    return value
+
+
+def _fields(item, fields):
+    values = {}
+    for field in fields:
+        value = _value(item.get(field, None))
+        if value is not None:
+            values[field] = value
+    return values
+
+
+def json_ld_values(scripts):
+    """{'article': fields, 'product': fields} of the first Article and
+    Product items in the JSON-LD scripts, invalid ones being skipped"""
+    values = {'article': {}, 'product': {}}
+    for script in scripts:
+        try:
+            data = json.loads(script)
+        except ValueError:
+            continue
+        for item in _json_ld_items(data):
+            types = _types(item)
+            if types & ARTICLE_TYPES and not values['article']:
+                values['article'] = _fields(item, ARTICLE_FIELDS)
+            if types & PRODUCT_TYPES and not values['product']:
+                product = _fields(item, PRODUCT_FIELDS)
+                offers = item.get('offers', None)
+                if isinstance(offers, list):
+                    offers = offers[0] if offers else None
+                if isinstance(offers, dict):
+                    product.update(_fields(offers, OFFER_FIELDS))
+                values['product'] = product
+    return values
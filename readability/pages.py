@@ -0,0 +1,399 @@
+"""
+Articles split over several pages, stitched back together.
+
+    with Stitcher(max_pages=10, max_concurrency=4) as stitcher:
+        stitched = stitcher.stitch(html, url)
+        print(stitched.urls)
+        save(stitched.html)
+
+The next page is found among the links of the page the way readability.js
+finds it: links to the same host, whose url has a page number past the
+base url of the article, scored by their text, class and id and those of
+their ancestors.  The articles of the pages are appended in order, each in
+a div of its own.
+
+Pages are fetched through a Fetcher, an HTTPFetcher reusing its keep-alive
+connections by default, by a pool of max_concurrency threads.  The next
+page is fetched while the current one is being extracted, and
+stitch_many() works on several articles at a time.
+"""
+import logging
+import re
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree
+
+from .cleaners import clean
+from .readability import Document
+from .readability import Unparseable
+
+try:
+    from http.client import HTTPConnection, HTTPSConnection, HTTPException
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    from httplib import HTTPConnection, HTTPSConnection, HTTPException
+    from urlparse import urljoin, urlsplit
+
+zlog = logging.getLogger('econtext.text')
+
+# Link scoring of readability.js.
+NEXT_LINK = re.compile(r'(next|weiter|continue|>([^\|]|$)|\xbb([^\|]|$))',
+                       re.I)
+PREV_LINK = re.compile(r'(prev|earl|old|new|<|\xab)', re.I)
+PAGE_LINK = re.compile(r'pag(e|ing|inat)', re.I)
+FIRST_LAST = re.compile(r'(first|last)', re.I)
+EXTRANEOUS = re.compile(
+    r'print|archive|comment|discuss|e[\-]?mail|share|reply|all|login|sign|'
+    r'single', re.I)
+PAGE_IN_URL = re.compile(r'p(a|g|ag)?(e|ing|ination)?(=|/)[0-9]{1,2}|'
+                         r'(page|paging)', re.I)
+POSITIVE = re.compile(r'article|body|content|entry|hentry|main|page|'
+                      r'pagination|post|text|blog|story', re.I)
+NEGATIVE = re.compile(r'combx|comment|com-|contact|foot|footer|footnote|'
+                      r'masthead|media|meta|outbrain|promo|related|scroll|'
+                      r'shoutbox|sidebar|sponsor|shopping|tags|tool|widget',
+                      re.I)
+MIN_NEXT_SCORE = 50
+
+REDIRECTS = (301, 302, 303, 307, 308)
+
+# Errors of a page that can't be parsed or extracted, Unparseable being a
+# ValueError: the article ends before such a page.
+PAGE_ERRORS = (lxml.etree.ParserError, ValueError, UnicodeError)
+
+
+class FetchError(Exception):
+    pass
+
+
+Stitched = namedtuple('Stitched', ['html', 'urls'])
+
+
+def _normalized(url):
+    """url without its fragment and trailing slash"""
+    return url.split('#', 1)[0].rstrip('/')
+
+
+def base_url(url):
+    """url without the page number readability.js finds in its last two
+    path segments, and without its query"""
+    parts = urlsplit(url)
+    segments = parts.path.split('/')[::-1]
+    cleaned = []
+    for i, segment in enumerate(segments):
+        if '.' in segment:
+            name, kind = segment.split('.', 1)
+            if kind.isalpha():
+                segment = name
+        segment = segment.replace(',00', '')
+        if i < 2:
+            segment = re.sub(r'((_|-)?p[a-z]*|(_|-))[0-9]{1,2}$', '', segment,
+                             flags=re.I)
+        if i < 2 and re.match(r'^\d{1,2}$', segment):
+            continue
+        if i == 0 and segment.lower() == 'index':
+            continue
+        if i < 2 and len(segment) < 3 and \
+                not re.search('[a-z]', segments[0], re.I):
+            continue
+        cleaned.append(segment)
+    return '%s://%s%s' % (parts.scheme, parts.netloc,
+                          '/'.join(cleaned[::-1]))
+
+
+def _class_and_id(elem):
+    return '%s %s' % (elem.get('class', ''), elem.get('id', ''))
+
+
+def next_page_url(doc, url, seen=()):
+    """Url of the page after url, found among the links of doc (whose links
+    are absolute), or None.
+
+    :param seen: normalized urls of the pages already stitched.
+    """
+    base = base_url(url)
+    page = _normalized(url)
+    host = urlsplit(url).netloc.lower()
+    links = {}
+    for link in doc.iter('a'):
+        href = _normalized(link.get('href', '').strip())
+        if not href or href in (base, page) or href in seen:
+            continue
+        parts = urlsplit(href)
+        if parts.scheme not in ('http', 'https') or \
+                parts.netloc.lower() != host:
+            continue
+        text = clean(link.text_content())
+        if EXTRANEOUS.search(text) or len(text) > 25:
+            continue
+        if not re.search(r'\d', href.replace(base, '', 1)):
+            continue
+        if href not in links:
+            links[href] = {'score': 0, 'text': text}
+        else:
+            links[href]['text'] += ' | ' + text
+        found = links[href]
+        score = 0
+        if not href.startswith(base):
+            score -= 25
+        data = '%s %s' % (text, _class_and_id(link))
+        if NEXT_LINK.search(data):
+            score += 50
+        if PAGE_LINK.search(data):
+            score += 25
+        if FIRST_LAST.search(data) and not NEXT_LINK.search(found['text']):
+            score -= 65
+        if NEGATIVE.search(data) or EXTRANEOUS.search(data):
+            score -= 50
+        if PREV_LINK.search(data):
+            score -= 200
+        positive = negative = False
+        for parent in link.iterancestors():
+            names = _class_and_id(parent)
+            if not positive and PAGE_LINK.search(names):
+                positive = True
+                score += 25
+            if not negative and NEGATIVE.search(names) and \
+                    not POSITIVE.search(names):
+                negative = True
+                score -= 25
+        if PAGE_IN_URL.search(href):
+            score += 25
+        if EXTRANEOUS.search(href):
+            score -= 15
+        number = re.match(r'\s*(\d+)', text)
+        if number and int(number.group(1)):
+            number = int(number.group(1))
+            score += -10 if number == 1 else max(0, 10 - number)
+        found['score'] += score
+    best = None
+    for href, found in links.items():
+        if found['score'] >= MIN_NEXT_SCORE and \
+                (best is None or links[best]['score'] < found['score']):
+            best = href
+    return best
+
+
+class Fetcher(object):
+    """Gets the pages for a Stitcher, from several threads at once"""
+
+    def fetch(self, url, max_bytes=None):
+        """(bytes of the page, charset given by the server or None).
+
+        Raises FetchError when the page can't be had, or is larger than
+        max_bytes.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class HTTPFetcher(Fetcher):
+    """Fetches pages over HTTP(S), keeping the connections to every host
+    open between requests.
+
+    :param timeout: seconds to wait for a server.
+    :param headers: headers sent with every request.
+    :param max_redirects: redirects followed per page.
+    """
+
+    def __init__(self, timeout=10, headers=None, max_redirects=5):
+        self.timeout = timeout
+        self.headers = {'User-Agent': 'readability-lxml',
+                        'Accept-Encoding': 'identity'}
+        self.headers.update(headers or {})
+        self.max_redirects = max_redirects
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+        connection = HTTPSConnection if scheme == 'https' else HTTPConnection
+        return connection(netloc, timeout=self.timeout), False
+
+    def _release(self, scheme, netloc, connection):
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(connection)
+
+    def _get(self, url, max_bytes):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise FetchError('Not an http url: %s' % url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        while True:
+            connection, reused = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request('GET', path, headers=self.headers)
+                response = connection.getresponse()
+                length = response.getheader('Content-Length')
+                if max_bytes is not None and length and \
+                        int(length) > max_bytes:
+                    connection.close()
+                    raise FetchError('%s is larger than %d bytes'
+                                     % (url, max_bytes))
+                if max_bytes is None:
+                    body = response.read()
+                else:
+                    body = response.read(max_bytes + 1)
+            except (HTTPException, IOError, OSError) as e:
+                connection.close()
+                if reused:
+                    # the server closed the idle connection, try a new one
+                    continue
+                raise FetchError('%s: %s' % (url, e))
+            break
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            self._release(parts.scheme, parts.netloc, connection)
+        if max_bytes is not None and len(body) > max_bytes:
+            raise FetchError('%s is larger than %d bytes' % (url, max_bytes))
+        return response, body
+
+    def fetch(self, url, max_bytes=None):
+        for _ in range(self.max_redirects + 1):
+            response, body = self._get(url, max_bytes)
+            location = response.getheader('Location')
+            if response.status in REDIRECTS and location:
+                url = urljoin(url, location)
+                continue
+            if response.status != 200:
+                raise FetchError('%s: HTTP %d' % (url, response.status))
+            charset = re.search(r'charset=["\']?([\w.:-]+)',
+                                response.getheader('Content-Type') or '')
+            return body, charset.group(1) if charset else None
+        raise FetchError('%s: too many redirects' % url)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class Stitcher(object):
+    """Extracts the articles of pages along with their next pages.
+
+    :param fetcher: a Fetcher, an HTTPFetcher of its own if None.
+    :param max_pages: pages stitched per article, the first one included.
+    :param max_fetch_bytes: bytes fetched per article, the first page
+      excluded; a page that would go over them ends the article.
+    :param max_concurrency: pages fetched at the same time, and articles
+      stitch_many() works on at the same time.
+
+    The other keyword arguments are the Document options, parse_once being
+    on unless given.  Pages after the first get no meta paragraphs.
+    """
+
+    def __init__(self, fetcher=None, max_pages=10,
+                 max_fetch_bytes=5 * 1024 * 1024, max_concurrency=4,
+                 **options):
+        self._own_fetcher = fetcher is None
+        self.fetcher = fetcher or HTTPFetcher()
+        self.max_pages = max_pages
+        self.max_fetch_bytes = max_fetch_bytes
+        self.max_concurrency = max_concurrency
+        options.setdefault('parse_once', True)
+        self.options = options
+        self._fetches = ThreadPoolExecutor(max_concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._fetches.shutdown()
+        if self._own_fetcher:
+            self.fetcher.close()
+
+    def stitch(self, input, url, html_partial=False):
+        """Stitched html of the article starting on the page input from url,
+        and the urls of its pages.
+
+        :param html_partial: return only the div of the document, don't wrap
+          it in html and body tags.
+
+        Only an error on the first page is raised, as Unparseable; the
+        article ends before later pages that can't be fetched, parsed or
+        extracted.
+        """
+        urls = [url]
+        seen = set([_normalized(url)])
+        articles = []
+        fetched = 0
+        options = dict(self.options)
+        while True:
+            doc = Document(input, url=urls[-1], **options)
+            pending = None
+            try:
+                if len(urls) < self.max_pages and \
+                        fetched < self.max_fetch_bytes:
+                    next_url = next_page_url(doc._read_only_html(), urls[-1],
+                                             seen)
+                    if next_url is not None:
+                        pending = self._fetches.submit(
+                            self.fetcher.fetch, next_url,
+                            self.max_fetch_bytes - fetched)
+                article = doc.summary(html_partial=True)
+            except PAGE_ERRORS as e:
+                if not articles:
+                    if isinstance(e, Unparseable):
+                        raise
+                    raise Unparseable(str(e))
+                zlog.debug("Page %s could not be extracted: %s", urls[-1], e)
+                if pending is not None:
+                    pending.cancel()
+                urls.pop()
+                break
+            if article in articles:
+                # the same page again, under another url
+                urls.pop()
+                break
+            articles.append(article)
+            if pending is None:
+                break
+            try:
+                input, charset = pending.result()
+            except FetchError as e:
+                zlog.debug("Next page not fetched: %s", e)
+                break
+            fetched += len(input)
+            urls.append(next_url)
+            seen.add(_normalized(next_url))
+            options = dict(self.options, inject_meta=False)
+            if charset:
+                options['charset'] = charset
+        html = ''.join('<div id="readability-page-%d" class="page">%s</div>'
+                       % (number + 1, article)
+                       for number, article in enumerate(articles))
+        if html_partial:
+            html = '<div>%s</div>' % html
+        else:
+            html = '<html><body>%s</body></html>' % html
+        return Stitched(html, urls)
+
+    def stitch_many(self, items, html_partial=False):
+        """Stitched articles of (input, url) pairs, in order, max_concurrency
+        of them being worked on at a time.  An article that can't be
+        extracted gives its exception instead."""
+        def stitch(item):
+            try:
+                return self.stitch(item[0], item[1], html_partial)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(self.max_concurrency) as pool:
+            for stitched in pool.map(stitch, items):
+                yield stitched
@@ -1,27 +1,52 @@
 #!/usr/bin/env python
+import copy
 import logging
+import os
 import re
 import sys
+import time
 import chardet
 
 from collections import defaultdict
-from lxml.etree import tostring
+from lxml.etree import iselement
 from lxml.etree import tounicode
 from lxml.html import document_fromstring
 from lxml.html import fragment_fromstring
 
+from .boilerplate import fingerprint_blocks
+from .cache import input_digest
+from .cache import result_key
+from .cache import STATEFUL_OPTIONS
+from .cleaners import clean
 from .cleaners import clean_attributes
+from .cleaners import clean_text
 from .cleaners import html_cleaner
+from .cleaners import strip_bad_attributes
 from .htmls import build_doc
 from .htmls import get_body
+from .htmls import get_paragraphs
 from .htmls import get_title
+from .htmls import parse_to_title
 from .htmls import shorten_title
+from .htmls import truncate_tree
+from .lru import LRUCache
+from .metadata import json_ld_scripts
+from .metadata import json_ld_values
+from .metadata import meta_items
+from .metadata import strip_tags
+from .stats import NULL_STAGE
+from .stats import StageTimer
+from .templates import domain_of
+from .templates import locate
+from .textindex import TextIndex
 
 zlog = logging.getLogger('econtext.text')
 
 # Python 2.7 compatibility.
 if sys.version < '3':
     str = unicode
+else:
+    basestring = str
 
 REGEXES = {
     'unlikelyCandidatesRe':   re.compile('ad-break|agegate|cart|combx|comment|community|disclaimer|disqus|extra|foot|header|hidden|legal|menu|modal|nav|pager|pagination|polic|popup|reference|remark|review|rss|shoutbox|sidebar|slideshow|sponsor|toc|tweet|twitter|video|warranty', re.I),
@@ -40,6 +65,26 @@ REGEXES = {
 }
 
 
+# Matches of the class and id strings, which pages repeat a lot, shared by
+# every document of the process.
+class_id_cache = LRUCache(4096)
+
+
+def class_id_matches(value):
+    """
+    (negative matches, positive matches, unlikely, ok maybe) for a class or
+    id attribute value.
+    """
+    matches = class_id_cache.get(value)
+    if matches is None:
+        matches = (len(REGEXES['negativeRe'].findall(value)),
+                   len(REGEXES['positiveRe'].findall(value)),
+                   REGEXES['unlikelyCandidatesRe'].search(value) is not None,
+                   REGEXES['okMaybeItsACandidateRe'].search(value) is not None)
+        class_id_cache.set(value, matches)
+    return matches
+
+
 class Unparseable(ValueError):
     pass
 
@@ -83,12 +128,6 @@ def to_int(x):
     return int(x)
 
 
-def clean(text):
-    text = re.sub('\s*\n\s*', '\n', text)
-    text = re.sub('[ \t]{2,}', ' ', text)
-    return text.strip()
-
-
 def text_length(i):
     return len(clean(i.text_content() or ""))
 
@@ -105,7 +144,8 @@ class Document:
     def __init__(self, input, **options):
         """Generate the document
 
-        :param input: string of the html content.
+        :param input: string of the html content, or a tree lxml already
+          parsed it into.
 
         kwargs:
             - attributes:
@@ -113,6 +153,46 @@ class Document:
             - min_text_length:
             - retry_length:
             - url: will allow adjusting links to be absolute
+            - charset: encoding of the input bytes given by the transport,
+              e.g. the Content-Type HTTP header
+            - parse_once: parse and clean the input only once, and hand
+              every method (and every summary() retry) a copy of that tree
+            - stats: a readability.stats.Stats, or any object with the same
+              stage() and count() methods, told about every pipeline stage
+            - regex_clean_attributes: strip the bad attributes from the
+              serialized html with regexps, as older versions did
+            - max_bytes: only parse this many bytes of the input (characters
+              when it is a string)
+            - max_nodes: only keep this many nodes of the parsed tree
+            - time_budget: seconds the document may take from parsing on;
+              once they are spent there are no more retries or sanitizing,
+              and the best candidate found so far is returned
+            - templates: a readability.templates.TemplateCache remembering
+              where the article is on the pages of the domain, or of the
+              host of url
+            - cache: a readability.cache.ResultCache keeping the results of
+              summary(), title() and short_title() for the same input and
+              options, unless boilerplate or templates are given
+            - boilerplate: a readability.boilerplate.BoilerplateIndex of the
+              blocks seen on the pages of the domain, or of the host of url,
+              those on most of them being dropped before scoring
+            - inject_meta: add the meta and itemprop paragraphs to the
+              article summary() returns (the default); when false they are
+              never built, metadata() giving the values
+            - clean_while_parsing: leave comments and processing
+              instructions out of the tree, and drop the scripts, form
+              controls and the like from it as soon as it is parsed, so that
+              the cleaner works on a smaller tree; max_nodes then only
+              counts the nodes kept
+            - fast_title: title() and short_title() parse the page only up
+              to its title when they can, and never clean it; they use the
+              tree of summary() when parse_once already made one
+            - vectorized: score the candidates with NumPy on the tree
+              flattened into arrays (see readability.vectorized), when NumPy
+              is installed and there is no time_budget; the candidates and
+              their scores are the same
+
+        The budgets that ran out are listed in budget_exhausted.
 
         """
         self.input = input
@@ -120,35 +200,157 @@ class Document:
         self.domain = self.options.get('domain', None)
         self.html = None
         self.metaTags = None
+        self._json_ld = []
+        self._pristine = None
+        self._index = None
+        self._stats = self.options.get('stats', None)
+        self._deadline = None
+        self._digest = None
+        self.budget_exhausted = []
+        # The best candidate of the last summary(), and whether it took the
+        # second, less ruthless pass.
+        self.best_score = None
+        self.best_locator = None
+        self.retried = False
+    
+    def _stage(self, name, node=None):
+        if self._stats is None:
+            return NULL_STAGE
+        return StageTimer(self._stats, name, node)
+    
+    def _exhaust(self, budget):
+        if budget in self.budget_exhausted:
+            return
+        self.budget_exhausted.append(budget)
+        zlog.debug("%s exhausted, degrading the result", budget)
+        if self._stats is not None:
+            self._stats.count('budget_%s' % budget)
+    
+    def _out_of_time(self):
+        if self._deadline is None or time.time() < self._deadline:
+            return False
+        self._exhaust('time_budget')
+        return True
+    
+    def _cached(self, method, compute, html_partial=False):
+        cache = self.options.get('cache', None)
+        if cache is None or any(self.options.get(name, None) is not None
+                                for name in STATEFUL_OPTIONS):
+            return compute()
+        if self._digest is None:
+            self._digest = input_digest(self.input)
+            if self._digest is None:
+                return compute()
+        key = result_key(self._digest, self.options, method, html_partial)
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            # a result cut short by a budget may not be the same next time
+            if result is not None and not self.budget_exhausted:
+                cache.set(key, result)
+        return result
     
     def _html(self, force=False):
         if force or self.html is None:
-            self.html = self._parse(self.input)
-        if self.metaTags is None:
-            self.metaTags = self.collectMetaTags()
+            if self.options.get('parse_once', False):
+                pristine = self._pristine_html()
+                with self._stage('copy', pristine) as stage:
+                    self.html = stage.node = copy.deepcopy(pristine)
+            else:
+                self.html = self._parse(self.input)
+        if self.metaTags is None and self.options.get('inject_meta', True):
+            with self._stage('meta', self.html):
+                self.metaTags = self.collectMetaTags()
         return self.html
     
+    def _pristine_html(self):
+        """
+        Parsed and cleaned tree shared by every method in parse_once mode.
+        It must never be modified; callers that alter the tree get a copy
+        from _html().
+        """
+        if self._pristine is None:
+            self._pristine = self._parse(self.input)
+        return self._pristine
+    
+    def _read_only_html(self):
+        if self.options.get('parse_once', False):
+            return self._pristine_html()
+        return self._html(True)
+    
+    def _title_html(self, shorten=False):
+        """
+        Tree title() and short_title() look into: in fast_title mode, the
+        input parsed as far as they need and with only what the cleaner
+        would drop from its text dropped.
+        """
+        if not self.options.get('fast_title', False) or \
+                iselement(self.input) or self._pristine is not None:
+            return self._read_only_html()
+        input = self._limit_bytes(self.input)
+        with self._stage('parse_title') as stage:
+            doc = stage.node = parse_to_title(
+                input, self.options.get('charset', None), shorten)
+            self._limit_nodes(doc)
+            return clean_text(doc)
+    
+    def _limit_bytes(self, input):
+        max_bytes = self.options.get('max_bytes', None)
+        if max_bytes is not None and not iselement(input) and \
+                len(input) > max_bytes:
+            input = input[:max_bytes]
+            self._exhaust('max_bytes')
+        return input
+    
+    def _limit_nodes(self, doc):
+        max_nodes = self.options.get('max_nodes', None)
+        if max_nodes is not None and truncate_tree(doc, max_nodes):
+            self._exhaust('max_nodes')
+    
     def _parse(self, input):
-        doc = build_doc(input)
-        doc = html_cleaner.clean_html(doc)
-        base_href = self.options.get('url', None)
-        if base_href:
-            doc.make_links_absolute(base_href, resolve_base_href=True)
-        else:
-            doc.resolve_base_href()
+        time_budget = self.options.get('time_budget', None)
+        if time_budget is not None and self._deadline is None:
+            self._deadline = time.time() + time_budget
+        input = self._limit_bytes(input)
+        lean = self.options.get('clean_while_parsing', False)
+        with self._stage('parse') as stage:
+            doc = stage.node = build_doc(
+                input, self.options.get('charset', None), lean)
+            if iselement(input):
+                # the caller's tree, worked on in a copy
+                doc = stage.node = copy.deepcopy(doc)
+            # the cleaner drops them with every other script
+            self._json_ld = json_ld_scripts(doc)
+            if lean:
+                clean_text(doc)
+            self._limit_nodes(doc)
+        with self._stage('clean', doc):
+            html_cleaner(doc)
+        with self._stage('links', doc):
+            base_href = self.options.get('url', None)
+            if base_href:
+                doc.make_links_absolute(base_href, resolve_base_href=True)
+            else:
+                doc.resolve_base_href()
         return doc
     
     def content(self):
-        return get_body(self._html(True))
+        return get_body(self._html(True),
+                        self.options.get('regex_clean_attributes', False))
     
     def title(self):
-        return get_title(self._html(True))
+        return self._cached('title', lambda: get_title(self._title_html()))
     
     def short_title(self):
-        return shorten_title(self._html(True))
+        return self._cached(
+            'short_title', lambda: shorten_title(self._title_html(True)))
     
     def get_clean_html(self):
-         return clean_attributes(tounicode(self.html))
+        with self._stage('clean_attributes', self.html):
+            if self.options.get('regex_clean_attributes', False):
+                return clean_attributes(tounicode(self.html))
+            strip_bad_attributes(self.html)
+            return tounicode(self.html)
     
     def strip(self, text, strip=None):
         """
@@ -162,11 +364,26 @@ class Document:
                 text = text[:len(text) - strip_len]
         return text
         
+    def _meta_items(self, doc):
+        metas, props = meta_items(doc, self.METAPROPS, self.ITEMPROPS,
+                                  self.BADTAGS)
+        metas = [(prop, self.strip(content, self.domain))
+                 for prop, content in metas]
+        return metas, props
+    
     def collectMetaTags(self):
         metaDiv = fragment_fromstring('<div id="meta product content descriptions"/>')
+        metas, props = self._meta_items(self.html)
         dedupe = {}
-        self.addMeta(dedupe, metaDiv)
-        self.addProps(dedupe, metaDiv)
+        for prop, content in metas:
+            key = prop[prop.find(':')+1:]
+            if dedupe.get(key) != content:
+                self._addMetaParagraph(metaDiv, 'meta', prop, content)
+            dedupe[key] = content
+        for prop, content in props:
+            if dedupe.get(prop) != content:
+                self._addMetaParagraph(metaDiv, 'itemprop', prop, content)
+            dedupe[prop] = content
         return metaDiv
     
     
@@ -181,46 +398,32 @@ class Document:
         base.insert(0, metaTags)
         return base
     
-    def addMeta(self, dedupe, base=None):
-        """
-        Add meta tags as paragraph in the body, if they exist.
+    def _addMetaParagraph(self, base, kind, prop, content):
         """
-        if base is None:
-            base = self.html.find(".//body")
-        for elem in self.html.xpath(".//meta"):
-            prop = elem.attrib.get('name', elem.attrib.get('property', None))
-            if prop in self.METAPROPS:
-                metacontent = self.strip(elem.attrib.get('content'), self.domain)
-                if dedupe.get(prop[prop.find(':')+1:]) != metacontent:
-                    try:
-                        #zlog.debug(u" *** prop={} ** content={}".format(prop, re.sub("<.*?>", '', metacontent)))
-                        meta = fragment_fromstring(u'<p class="econtextmax meta {}">{}</p>'.format(prop, re.sub("<.*?>", '', metacontent)))
-                    except:
-                        #zlog.debug(u"metacontent {}: {}".format(prop, metacontent))
-                        pass
-                    base.insert(0, meta)
-                    #zlog.debug(u" ** Found meta: {}".format(tounicode(meta)))
-                dedupe[prop[prop.find(':')+1:]] = metacontent
-        return self
-    
-    def addProps(self, dedupe, base=None):
+        Add a meta tag or microdata item as a paragraph at the start of base
         """
-        Adds microdata items as paragraphs in the body, if they exist
+        try:
+            meta = fragment_fromstring(u'<p class="econtextmax {} {}">{}</p>'.format(kind, prop, strip_tags(content)))
+        except Exception:
+            # e.g. a meta tag without content
+            return
+        base.insert(0, meta)
+    
+    def metadata(self):
+        """Values of the meta tags in METAPROPS and of the microdata in
+        ITEMPROPS, by name, and the fields of the first JSON-LD Article and
+        Product, without adding anything to the tree.
+
+        {'meta': {...}, 'itemprop': {...}, 'article': {...}, 'product': {...}}
         """
-        if base is None:
-            base = self.html.find(".//body")
-        for elem in self.html.xpath(".//*[@itemprop]"):
-            if elem.attrib.get('itemprop') in self.ITEMPROPS:
-                ancestors = set(a.tag for a in elem.iterancestors())
-                if len(ancestors.intersection(set(Document.BADTAGS))) > 0:
-                    continue
-                metacontent = elem.attrib.get('content', elem.text_content().strip())
-                if dedupe.get(elem.attrib.get('itemprop')) != metacontent:
-                    meta = fragment_fromstring(u'<p class="econtextmax itemprop {}">{}</p>'.format(elem.attrib.get('itemprop'), re.sub("<.*?>", '', metacontent)))
-                    base.insert(0, meta)
-                    #zlog.debug(u" ** Found microdata: {}".format(tounicode(meta)))
-                dedupe[elem.attrib.get('itemprop')] = metacontent
-        return self
+        metas, props = self._meta_items(self._read_only_html())
+        values = {'meta': {}, 'itemprop': {}}
+        for kind, items in [('meta', metas), ('itemprop', props)]:
+            for prop, content in items:
+                if content is not None:
+                    values[kind].setdefault(prop, strip_tags(content))
+        values.update(json_ld_values(self._json_ld))
+        return values
     
     def summary(self, html_partial=False):
         """Generate the summary of the html docuemnt
@@ -229,31 +432,108 @@ class Document:
         in html and body tags.
 
         """
+        return self._cached('summary', lambda: self._summary(html_partial),
+                            html_partial)
+    
+    def _summary(self, html_partial):
+        self._article(html_partial)
+        if self.metaTags is not None:
+            self._addMetaTags(self.metaTags)
+        return self.get_clean_html()
+    
+    def text(self, include_meta=False):
+        """Text of the article that summary() finds, a paragraph per line,
+        without serializing it.
+
+        :param include_meta: start with the meta and itemprop paragraphs
+        summary() adds to the article.
+        """
+        return self._cached('text_meta' if include_meta else 'text',
+                            lambda: self._text(include_meta))
+    
+    def _text(self, include_meta):
+        article = self._article(html_partial=True)
+        paragraphs = get_paragraphs(article)
+        if include_meta and self.metaTags is not None:
+            paragraphs = get_paragraphs(self.metaTags) + paragraphs
+        return '\n'.join(paragraphs)
+    
+    def _article(self, html_partial):
+        """
+        Find and sanitize the article, which becomes self.html and is
+        returned.
+        """
+        templates = self.options.get('templates', None)
+        boilerplate = self.options.get('boilerplate', None)
+        domain = template = locator = None
+        if templates is not None or boilerplate is not None:
+            domain = domain_of(self.domain, self.options.get('url', None))
+        if templates is not None and domain is not None:
+            template = templates.get(domain)
+        else:
+            templates = None
+        if domain is None:
+            boilerplate = None
+        boilerplate_learnt = False
         try:
-            ruthless = True
+            # pages of the domain that needed the second, less ruthless pass
+            # likely need it again
+            ruthless = template is None or template['ruthless']
+            self.retried = False
+            template_tried = False
             while True:
                 self._html(True)
-                to_drop = []
-                for i in self.tags(self.html, *self.BADTAGS):
-                    to_drop.append(i)
-                for i in to_drop:
-                    i.drop_tree()
+                with self._stage('badtags', self.html):
+                    to_drop = []
+                    for i in self.tags(self.html, *self.BADTAGS):
+                        to_drop.append(i)
+                    for i in to_drop:
+                        i.drop_tree()
                 
                 for i in self.tags(self.html, 'body'):
                     i.set('id', 'readabilityBody')
-                if ruthless:
-                    self.remove_unlikely_candidates()
-                self.transform_misused_divs_into_paragraphs()
-                candidates = self.score_paragraphs()
-
-                best_candidate = self.select_best_candidate(candidates)
+                if boilerplate is not None:
+                    with self._stage('boilerplate', self.html):
+                        self.remove_boilerplate(boilerplate, domain,
+                                                learn=not boilerplate_learnt)
+                    boilerplate_learnt = True
+                if ruthless and not self._out_of_time():
+                    with self._stage('unlikely', self.html):
+                        self.remove_unlikely_candidates()
+                with self._stage('transform', self.html):
+                    self.transform_misused_divs_into_paragraphs()
+                self._index = TextIndex()
+                best_candidate = None
+                if templates is not None and not template_tried:
+                    template_tried = True
+                    with self._stage('template', self.html):
+                        candidates, best_candidate = self.apply_template(
+                            templates, domain)
+                if best_candidate is None:
+                    with self._stage('score', self.html):
+                        candidates = self.score_paragraphs()
+                        best_candidate = self.select_best_candidate(candidates)
+                    if templates is not None and best_candidate:
+                        # before get_article() moves it out of the tree
+                        locator = locate(best_candidate['elem'])
+                        locator_ruthless = ruthless
+                if self._stats is not None:
+                    self._stats.count('candidates', len(candidates))
+                self.best_score = self.best_locator = None
+                if best_candidate:
+                    self.best_score = best_candidate['content_score']
+                    self.best_locator = locate(best_candidate['elem'])
 
                 if best_candidate:
-                    article = self.get_article(candidates, best_candidate, html_partial=html_partial)
+                    with self._stage('article') as stage:
+                        article = stage.node = self.get_article(candidates, best_candidate, html_partial=html_partial)
                 else:
-                    if ruthless:
+                    if ruthless and not self._out_of_time():
                         #zlog.debug("ruthless removal did not work. ")
                         ruthless = False
+                        self.retried = True
+                        if self._stats is not None:
+                            self._stats.count('retries')
                         #zlog.debug("ended up stripping too much - going for a safer _parse")
                         # try again
                         continue
@@ -263,23 +543,32 @@ class Document:
                         if article is None:
                             article = self.html
                 
-                cleaned_article = self.sanitize(article, candidates)
-                article_length = len(cleaned_article or '')
+                with self._stage('sanitize', article):
+                    self.sanitize_tree(article, candidates)
                 retry_length = self.options.get('retry_length', self.RETRY_LENGTH)
-                of_acceptable_length = article_length >= retry_length
-                if ruthless and not of_acceptable_length:
+                # The html is at least as long as the text, so it only needs
+                # serializing to measure when the text is too short.
+                of_acceptable_length = \
+                    self._text_length(self.html) >= retry_length or \
+                    len(self.get_clean_html() or '') >= retry_length
+                if ruthless and not of_acceptable_length and \
+                        not self._out_of_time():
                     ruthless = False
+                    self.retried = True
+                    if self._stats is not None:
+                        self._stats.count('retries')
                     # Loop through and try again.
                     continue
                 else:
                     break
+            if locator is not None and of_acceptable_length:
+                templates.set(domain, locator, locator_ruthless)
         except Exception as e:
             logging.exception('error getting summary: ')
             raise Unparseable(str(e))
-        
-        # return here
-        self._addMetaTags(self.metaTags)
-        return self.get_clean_html()
+        finally:
+            self._index = None
+        return self.html
     
     def get_article(self, candidates, best_candidate, html_partial=False):
         # Now that we have the top candidate, look through its siblings for
@@ -327,10 +616,31 @@ class Document:
                     output.append(sibling)
                 else:
                     output.getchildren()[0].getchildren()[0].append(sibling)
+        if parent is not None and self._index is not None:
+            self._index.invalidate(parent)
         #if output is not None:
         #    output.append(best_elem)
         return output
     
+    def apply_template(self, templates, domain):
+        """
+        Candidates scored within the element the template of domain
+        locates, and that element as the best candidate, or None for both if
+        it doesn't pass for an article.
+        """
+        elem = templates.lookup(domain, self.html)
+        if elem is None:
+            return None, None
+        valid = self._text_length(elem) >= templates.min_text_length and \
+            self.get_link_density(elem) <= templates.max_link_density
+        templates.validated(domain, valid)
+        if not valid:
+            return None, None
+        candidates = self.score_paragraphs(elem)
+        if elem not in candidates:
+            candidates[elem] = self.score_node(elem)
+        return candidates, candidates[elem]
+    
     def select_best_candidate(self, candidates):
         sorted_candidates = sorted(list(candidates.values()), key=lambda x: x['content_score'], reverse=True)
         for candidate in sorted_candidates[:5]:
@@ -344,6 +654,10 @@ class Document:
         return best_candidate
     
     def get_link_density(self, elem):
+        if self._index is not None:
+            link_length = self._index.link_length(elem)
+            total_length = self._index.text_length(elem)
+            return float(link_length) / max(total_length, 1)
         link_length = 0
         for i in elem.findall(".//a"):
             link_length += text_length(i)
@@ -352,18 +666,32 @@ class Document:
         total_length = text_length(elem)
         return float(link_length) / max(total_length, 1)
     
-    def score_paragraphs(self, ):
+    def score_paragraphs(self, node=None):
         MIN_LEN = self.options.get('min_text_length', self.TEXT_LENGTH_THRESHOLD)
+        if node is None:
+            node = self._html()
+        if self.options.get('vectorized', False) and self._deadline is None:
+            # NumPy is only imported by the documents asking for it
+            from . import vectorized
+            if vectorized.numpy is not None:
+                return self._score_flat(node, MIN_LEN)
         candidates = {}
         ordered = []
-        for elem in self.tags(self._html(), "p", "pre", "td"):
+        for elem in self.tags(node, "p", "pre", "td"):
+            if self._out_of_time():
+                break
             parent_node = elem.getparent()
             if parent_node is None:
                 continue
             grand_parent_node = parent_node.getparent()
 
-            inner_text = clean(elem.text_content() or "")
-            inner_text_len = len(inner_text)
+            if self._index is not None:
+                inner_text_len = self._index.text_length(elem)
+                comma_count = self._index.comma_count(elem)
+            else:
+                inner_text = clean(elem.text_content() or "")
+                inner_text_len = len(inner_text)
+                comma_count = inner_text.count(',')
 
             # If this paragraph is less than 25 characters
             # don't even count it.
@@ -380,7 +708,7 @@ class Document:
                 ordered.append(grand_parent_node)
 
             content_score = 1
-            content_score += len(inner_text.split(','))
+            content_score += comma_count + 1
             content_score += min((inner_text_len / 100), 3)
             #if elem not in candidates:
             #    candidates[elem] = self.score_node(elem)
@@ -402,24 +730,26 @@ class Document:
             
         return candidates
     
+    def _score_flat(self, node, min_text_length):
+        from . import vectorized
+        index = self._index
+        if index is None:
+            index = TextIndex()
+        tree = vectorized.flatten(node, index, self.class_weight)
+        [(positions, scores)] = vectorized.score_trees([tree], min_text_length)
+        candidates = {}
+        for position, score in zip(positions, scores):
+            elem = tree.nodes[position]
+            candidates[elem] = {'content_score': float(score), 'elem': elem}
+        return candidates
+
     def class_weight(self, e):
         weight = 0
-        if e.get('class', None):
-            if REGEXES['negativeRe'].search(e.get('class')):
-                #zlog.debug(u"debiting score for negativeRe in class {}".format(describe(e)))
-                weight -= 35 * len(REGEXES['negativeRe'].findall(e.get('class')))
-                
-            if REGEXES['positiveRe'].search(e.get('class')):
-                weight += 25 * len(REGEXES['positiveRe'].findall(e.get('class')))
-                
-        if e.get('id', None):
-            if REGEXES['negativeRe'].search(e.get('id')):
-                #zlog.debug(u"debiting score for negativeRe in id {}".format(describe(e)))
-                weight -= 35 * len(REGEXES['negativeRe'].findall(e.get('id')))
-                
-            if REGEXES['positiveRe'].search(e.get('id')):
-                weight += 25 * len(REGEXES['positiveRe'].findall(e.get('id')))
-                
+        for name in ('class', 'id'):
+            value = e.get(name, None)
+            if value:
+                negative, positive, _, _ = class_id_matches(value)
+                weight += 25 * positive - 35 * negative
         return weight
     
     def score_node(self, elem):
@@ -438,6 +768,35 @@ class Document:
             'elem': elem
         }
     
+    def _text_length(self, elem):
+        if self._index is not None:
+            return self._index.text_length(elem)
+        return text_length(elem)
+    
+    def _comma_count(self, elem):
+        if self._index is not None:
+            return self._index.comma_count(elem)
+        return elem.text_content().count(",")
+    
+    def _is_empty(self, elem):
+        if self._index is not None:
+            return self._index.is_empty(elem)
+        return elem.text_content().strip() == ''
+    
+    def _tag_counts(self, elem):
+        if self._index is not None:
+            return self._index.tag_counts(elem)
+        counts = {}
+        for kind in ['p', 'img', 'li', 'a', 'embed', 'input']:
+            counts[kind] = len(elem.findall('.//%s' % kind))
+        return counts
+    
+    def _drop_tree(self, elem):
+        if self._index is not None:
+            self._index.drop_tree(elem)
+        else:
+            elem.drop_tree()
+    
     def debug(self, *a):
         if self.options.get('debug', False):
             logging.debug(*a)
@@ -445,14 +804,20 @@ class Document:
     def remove_unlikely_candidates(self):
         to_remove = []
         for elem in self.html.iter():
-            s = "%s %s" % (elem.get('class', ''), elem.get('id', ''))
-            styles = elem.get('style', '')
-            
-            #zlog.debug(u"checking : {} - {} - {}".format(type(elem), s, styles))
-            if len(s) < 2:
+            unlikely = ok_maybe = False
+            values = [elem.get('class', None), elem.get('id', None)]
+            if not any(values):
                 continue
+            # The keywords have no spaces, so matching the class and id
+            # apart is the same as matching "class id".
+            for value in values:
+                if value:
+                    _, _, value_unlikely, value_ok = class_id_matches(value)
+                    unlikely = unlikely or value_unlikely
+                    ok_maybe = ok_maybe or value_ok
+            styles = elem.get('style', '')
             
-            if REGEXES['unlikelyCandidatesRe'].search(s) and (not REGEXES['okMaybeItsACandidateRe'].search(s)) and elem.tag not in ['html', 'body']:
+            if unlikely and not ok_maybe and elem.tag not in ['html', 'body']:
                 #zlog.debug(u"Removing unlikely candidate - %s" % describe(elem))
                 to_remove.append(elem)
                 continue
@@ -465,16 +830,92 @@ class Document:
         for elem in to_remove:
                 elem.drop_tree()
     
+    def remove_boilerplate(self, index, domain, learn=True):
+        """
+        Drop the blocks recurring on the pages of domain, after counting
+        those of this page if learn.  The article may recur too, so the
+        blocks holding most of the text of the page, the parent of the most
+        paragraph text and its ancestors are kept along with everything
+        within them.
+        """
+        blocks = fingerprint_blocks(self.html)
+        fingerprints = [fingerprint for elem, fingerprint in blocks]
+        if learn:
+            index.add(domain, fingerprints)
+        recurring = index.recurring(domain, fingerprints)
+        if not recurring:
+            return
+        half = text_length(self.html) / 2.0
+        # A stand-in for the best candidate, which would take scoring the
+        # page twice: the parent of the most paragraph text, less its links.
+        paragraph_text = {}
+        for elem in self.tags(self.html, 'p', 'pre', 'td'):
+            parent = elem.getparent()
+            if parent is not None:
+                paragraph_text[parent] = paragraph_text.get(parent, 0) + \
+                    text_length(elem)
+        article = None
+        best = 0
+        for parent, length in paragraph_text.items():
+            links = sum(text_length(a) for a in parent.iter('a'))
+            weight = length * (1 - float(links) / max(text_length(parent), 1))
+            if weight > best:
+                article, best = parent, weight
+        kept = set()
+        if article is not None:
+            kept.add(article)
+            kept.update(article.iterancestors())
+        dropped = set()
+        spared = set()
+        # parents first, so blocks within a dropped or spared one are left
+        # alone
+        for elem, fingerprint in reversed(blocks):
+            if fingerprint not in recurring:
+                continue
+            if any(parent in dropped or parent in spared
+                   for parent in elem.iterancestors()):
+                continue
+            if elem in kept or text_length(elem) > half:
+                spared.add(elem)
+            else:
+                dropped.add(elem)
+        for elem in dropped:
+            elem.drop_tree()
+        if dropped and self._stats is not None:
+            self._stats.count('boilerplate', len(dropped))
+    
+    def block_containers(self, node):
+        """
+        Find the elements that have a descendant divToPElementsRe matches,
+        the same ones for which the regexp would match the serialized
+        children, in a single pass over the tree.
+        """
+        block_re = REGEXES['divToPElementsRe']
+        block_tags = {}
+        containers = set()
+        for elem in node.iter():
+            tag = elem.tag
+            if isinstance(tag, basestring):
+                if tag not in block_tags:
+                    block_tags[tag] = block_re.match('<' + tag) is not None
+                is_block = block_tags[tag]
+            else:
+                # comments are serialized along with the elements
+                is_block = block_re.search(elem.text or '') is not None
+            if not is_block:
+                continue
+            parent = elem.getparent()
+            while parent is not None and parent not in containers:
+                containers.add(parent)
+                parent = parent.getparent()
+        return containers
+    
     def transform_misused_divs_into_paragraphs(self):
+        containers = self.block_containers(self.html)
         for elem in self.tags(self.html, 'div'):
             # transform <div>s that do not contain other block elements into
             # <p>s
-            #FIXME: The current implementation ignores all descendants that
-            # are not direct children of elem
-            # This results in incorrect results in case there is an <img>
-            # buried within an <a> for example
-            if not REGEXES['divToPElementsRe'].search(
-                    str(b''.join(map(tostring, list(elem))))):
+            if elem not in containers:
                 #self.debug("Altering %s to p" % (describe(elem)))
                 elem.tag = "p"
                 #print "Fixed element "+describe(elem)
@@ -512,6 +953,14 @@ class Document:
                 yield e
     
     def sanitize(self, node, candidates):
+        self.sanitize_tree(node, candidates)
+        return self.get_clean_html()
+    
+    def sanitize_tree(self, node, candidates):
+        """
+        Drop the parts of node that don't look like content, node becoming
+        the document.
+        """
         MIN_LEN = self.options.get('min_text_length', self.TEXT_LENGTH_THRESHOLD)
         to_drop = []
         for header in self.tags(node, "h1", "h2", "h3", "h4", "h5", "h6"):
@@ -522,12 +971,14 @@ class Document:
             to_drop.append(elem)
         
         for elem in to_drop:
-            elem.drop_tree()
+            self._drop_tree(elem)
         
         allowed = {}
         # Conditionally clean <table>s, <ul>s, and <div>s
         to_drop = []
         for el in self.reverse_tags(node, "table", "ul", "div"):
+            if self._out_of_time():
+                break
             if el in allowed:
                 continue
             weight = self.class_weight(el)
@@ -540,17 +991,15 @@ class Document:
 
             if weight + content_score < 0:
                 #zlog.debug(u"Cleaned %s with score %6.3f and weight %-3s" % (describe(el), content_score, weight, ))
-                el.drop_tree()
+                self._drop_tree(el)
                 continue
             
-            elif el.text_content().count(",") < 10:
-                counts = {}
-                for kind in ['p', 'img', 'li', 'a', 'embed', 'input']:
-                    counts[kind] = len(el.findall('.//%s' % kind))
+            elif self._comma_count(el) < 10:
+                counts = self._tag_counts(el)
                 counts["li"] -= 100
                 
                 # Count the text length excluding any surrounding whitespace
-                content_length = text_length(el)
+                content_length = self._text_length(el)
                 link_density = self.get_link_density(el)
                 parent_node = el.getparent()
                 if parent_node is not None:
@@ -617,7 +1066,7 @@ class Document:
                     siblings = []
                     for sib in el.itersiblings():
                         #self.debug(sib.text_content())
-                        sib_content_length = text_length(sib)
+                        sib_content_length = self._text_length(sib)
                         if sib_content_length:
                             i =+ 1
                             siblings.append(sib_content_length)
@@ -625,7 +1074,7 @@ class Document:
                                 break
                     for sib in el.itersiblings(preceding=True):
                         #self.debug(sib.text_content())
-                        sib_content_length = text_length(sib)
+                        sib_content_length = self._text_length(sib)
                         if sib_content_length:
                             j =+ 1
                             siblings.append(sib_content_length)
@@ -642,17 +1091,19 @@ class Document:
                     #zlog.debug(u"Cleaned %6.3f %s with weight %s cause it has %s." % (content_score, describe(el), weight, reason))
                     #print tounicode(el)
                     #self.debug("pname %s pweight %.3f" %(pname, pweight))
-                    el.drop_tree()
+                    self._drop_tree(el)
                     continue
         
         ## Remove empty tags
         for el in self.reverse_tags(node, "*"):
-            if el.text_content().strip() == '':
-                el.drop_tree()
+            if self._out_of_time():
+                break
+            if self._is_empty(el):
+                self._drop_tree(el)
         
         for el in to_drop:
             if el.getparent() is not None:
-                el.drop_tree()
+                self._drop_tree(el)
         
         #for el in ([node] + [n for n in node.iter()]):
         #    if not self.options.get('attributes', None):
@@ -660,7 +1111,6 @@ class Document:
         #        pass
         
         self.html = node
-        return self.get_clean_html()
 
 
 class HashableElement():
@@ -692,20 +1142,54 @@ class HashableElement():
 
 def main():
     from optparse import OptionParser
-    parser = OptionParser(usage="%prog: [options] [file]")
+    parser = OptionParser(usage="%prog: [options] [file|directory|glob ...]")
     parser.add_option('-v', '--verbose', action='store_true')
     parser.add_option('-u', '--url', default=None, help="use URL instead of a local file")
+    parser.add_option('--jsonl', action='store_true',
+                      help="read JSON lines with url and html from stdin, write JSON lines of results")
+    parser.add_option('-j', '--workers', type='int', default=None,
+                      help="number of worker processes for JSON lines output")
+    parser.add_option('--chunksize', type='int', default=4,
+                      help="documents sent to a worker at a time")
+    parser.add_option('--timeout', type='float', default=None,
+                      help="seconds allowed per document")
+    parser.add_option('--unordered', action='store_true',
+                      help="write results as they complete")
+    parser.add_option('--max-bytes', type='int', default=None,
+                      help="only parse the start of every document")
+    parser.add_option('--max-nodes', type='int', default=None,
+                      help="only keep the first nodes of every document")
+    parser.add_option('--time-budget', type='float', default=None,
+                      help="seconds after which a document is cut short")
     (options, args) = parser.parse_args()
 
-    if not (len(args) == 1 or options.url):
-        parser.print_help()
-        sys.exit(1)
-    
     if options.verbose:
         zlog.addHandler(logging.StreamHandler())
         zlog.setLevel(logging.DEBUG)
         zlog.debug("DEBUG turned on")
 
+    budgets = {}
+    for name in ['max_bytes', 'max_nodes', 'time_budget']:
+        if getattr(options, name) is not None:
+            budgets[name] = getattr(options, name)
+
+    if options.jsonl or options.workers or len(args) > 1 or \
+            (len(args) == 1 and not os.path.isfile(args[0])):
+        from .batch import iter_files, iter_jsonl, iter_paths, stream
+        if options.jsonl:
+            sources = iter_jsonl(sys.stdin)
+        else:
+            sources = iter_files(iter_paths(args))
+        count, errors = stream(
+            sources, out=sys.stdout, progress=sys.stderr, options=budgets,
+            processes=options.workers, chunksize=options.chunksize,
+            timeout=options.timeout, ordered=not options.unordered)
+        sys.exit(1 if errors and errors == count else 0)
+
+    if not (len(args) == 1 or options.url):
+        parser.print_help()
+        sys.exit(1)
+
     file = None
     if options.url:
         # Python 2.7 compatibility
@@ -719,7 +1203,8 @@ def main():
         file = open(args[0], 'rt')
     enc = sys.__stdout__.encoding or 'utf-8'
     try:
-        doc = Document(file.read(), debug=options.verbose, url=options.url).summary()
+        doc = Document(file.read(), debug=options.verbose, url=options.url,
+                       **budgets).summary()
         print(doc)
     finally:
         file.close()
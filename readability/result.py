@@ -0,0 +1,140 @@
+"""
+Everything extracted from a page, computed on first access only.
+
+    result = extract(html, url=url)
+    print(result.title, result.score)
+    classify(result.text)
+
+The page is parsed once, and the article found once for html, text, score,
+locator and retried alike.  Once every field has been computed the result
+lets go of the Document, keeping only the values.
+"""
+from .htmls import get_paragraphs
+from .readability import Document
+
+
+class lazy_field(object):
+    """A field computed by the decorated method on first access and kept
+    in the slot of the same name prefixed with an underscore"""
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.slot = '_' + compute.__name__
+        self.__doc__ = compute.__doc__
+
+    def __get__(self, result, owner):
+        if result is None:
+            return self
+        try:
+            return getattr(result, self.slot)
+        except AttributeError:
+            value = self.compute(result)
+            setattr(result, self.slot, value)
+            result._computed()
+            return value
+
+
+FIELDS = ['html', 'text', 'title', 'short_title', 'meta', 'score', 'locator',
+          'retried']
+
+
+class ExtractResult(object):
+    """Fields extracted from a Document.
+
+    html: the article as summary() gives it.
+    text: the article as text() gives it.
+    title, short_title: as title() and short_title() give them.
+    meta: the values metadata() gives.
+    score: content score of the best candidate, None if there was none.
+    locator: (tag, id, class) path from the root to the best candidate.
+    retried: whether the article took the second, less ruthless pass.
+    """
+
+    __slots__ = ['_document', '_html_partial', '_article_tree'] + \
+        ['_' + name for name in FIELDS]
+
+    def __init__(self, document, html_partial=False):
+        self._document = document
+        self._html_partial = html_partial
+
+    def __repr__(self):
+        computed = [name for name in FIELDS if hasattr(self, '_' + name)]
+        return '<ExtractResult %s>' % ' '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in computed)
+
+    def _computed(self):
+        if self._document is not None and \
+                all(hasattr(self, '_' + name) for name in FIELDS):
+            self._document = None
+            self._article_tree = None
+
+    def _article(self):
+        document = self._document
+        if not hasattr(self, '_article_tree'):
+            self._article_tree = document._article(self._html_partial)
+        else:
+            # without parse_once, title() and metadata() parse the page
+            # again into document.html
+            document.html = self._article_tree
+        return self._article_tree
+
+    def _summary(self):
+        document = self._document
+        self._article()
+        meta = document.metaTags
+        if meta is None:
+            return document.get_clean_html()
+        document._addMetaTags(meta)
+        try:
+            return document.get_clean_html()
+        finally:
+            meta.getparent().remove(meta)
+
+    @lazy_field
+    def html(self):
+        return self._document._cached('summary', self._summary,
+                                      self._html_partial)
+
+    @lazy_field
+    def text(self):
+        return self._document._cached(
+            'text', lambda: '\n'.join(get_paragraphs(self._article())))
+
+    @lazy_field
+    def title(self):
+        return self._document.title()
+
+    @lazy_field
+    def short_title(self):
+        return self._document.short_title()
+
+    @lazy_field
+    def meta(self):
+        return self._document.metadata()
+
+    @lazy_field
+    def score(self):
+        self._article()
+        return self._document.best_score
+
+    @lazy_field
+    def locator(self):
+        self._article()
+        return self._document.best_locator
+
+    @lazy_field
+    def retried(self):
+        self._article()
+        return self._document.retried
+
+
+def extract(input, html_partial=False, **options):
+    """Lazily extract the fields of ExtractResult from input.
+
+    :param html_partial: see Document.summary().
+
+    The other keyword arguments are the Document options, parse_once being
+    on unless given.
+    """
+    options.setdefault('parse_once', True)
+    return ExtractResult(Document(input, **options), html_partial)
@@ -0,0 +1,623 @@
+"""
+Extraction served over HTTP, on a TCP port or a Unix socket, by a pool of
+worker processes that have readability imported and warmed up.
+
+    python -m readability.server --port 8000 --workers 4
+    curl --data-binary @page.html 'localhost:8000/extract?url=http://...'
+
+POST /extract takes the html as the body, with the Document options in the
+query string, or a JSON object with html and the options when sent as
+application/json.  It answers with the summary, title, short title, error
+and elapsed seconds as JSON, the status being 422 when the page could not
+be extracted and 504 when it took longer than the timeout.  GET /health
+answers ok, and GET /metrics gives the counters, queue depth, throughput
+and latency histograms in the Prometheus text format.
+
+Requests wait in a bounded queue; when it is full they are turned away at
+once with a 503 rather than piling up.  With a batch size over 1, small
+requests arriving together go to a worker as one chunk.  Documents whose
+worker dies are answered with an error after result_timeout seconds.
+"""
+import bisect
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from collections import deque
+
+from .batch import EXPIRE_INTERVAL
+from .batch import BatchResult
+from .batch import _extract_chunk
+from .readability import Document
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+    from urllib.parse import parse_qsl, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+    from urlparse import parse_qsl, urlsplit
+
+zlog = logging.getLogger('econtext.text')
+
+# Python 2.7 compatibility.
+if sys.version < '3':
+    str = unicode
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if str(value).lower() in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError('not a boolean: %r' % value)
+
+
+# Document options a request may give, and how to read them.
+REQUEST_OPTIONS = {
+    'url': str,
+    'domain': str,
+    'charset': str,
+    'html_partial': _flag,
+    'min_text_length': int,
+    'retry_length': int,
+    'regex_clean_attributes': _flag,
+    'max_bytes': int,
+    'max_nodes': int,
+    'time_budget': float,
+    'inject_meta': _flag,
+    'fast_title': _flag,
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+def request_options(pairs):
+    """Options of a request from (name, value) pairs, ValueError for the
+    unknown and the invalid"""
+    options = {}
+    for name, value in pairs:
+        if name not in REQUEST_OPTIONS:
+            raise ValueError('unknown option %r' % name)
+        try:
+            options[name] = REQUEST_OPTIONS[name](value)
+        except (TypeError, ValueError):
+            raise ValueError('invalid %s: %r' % (name, value))
+    return options
+
+
+class Histogram(object):
+    """Counts of observations by bucket upper bound"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            lines.append('%s_bucket{le="%s"} %d' % (name, bound, total))
+        lines.append('%s_sum %f' % (name, self.sum))
+        lines.append('%s_count %d' % (name, self.count))
+        return lines
+
+
+class Metrics(object):
+    """What /metrics reports, updated by every request thread.
+
+    :param window: seconds over which the throughput is measured.
+    """
+
+    def __init__(self, window=60.0):
+        self.window = window
+        self.started = time.time()
+        self.requests = {}
+        self.documents = 0
+        self.errors = 0
+        self.batches = 0
+        self.latency = Histogram()
+        self.extraction = Histogram()
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def request(self, code, elapsed):
+        with self._lock:
+            self.requests[code] = self.requests.get(code, 0) + 1
+            self.latency.observe(elapsed)
+
+    def batch(self, results):
+        now = time.time()
+        with self._lock:
+            self.batches += 1
+            for result in results:
+                self.documents += 1
+                if result.error:
+                    self.errors += 1
+                self.extraction.observe(result.elapsed)
+                self._recent.append(now)
+            self._forget(now)
+
+    def _forget(self, now):
+        while self._recent and self._recent[0] < now - self.window:
+            self._recent.popleft()
+
+    def throughput(self):
+        """Documents extracted per second over the window"""
+        now = time.time()
+        with self._lock:
+            self._forget(now)
+            return len(self._recent) / min(self.window,
+                                           max(now - self.started, 1e-9))
+
+    def render(self, gauges):
+        """The Prometheus text format of the metrics and of gauges, a list
+        of (name, help, value)"""
+        throughput = self.throughput()
+        with self._lock:
+            lines = ['# HELP readability_requests_total HTTP requests by '
+                     'status code.',
+                     '# TYPE readability_requests_total counter']
+            for code in sorted(self.requests):
+                lines.append('readability_requests_total{code="%d"} %d' %
+                             (code, self.requests[code]))
+            for name, help, value in [
+                    ('documents_total', 'Documents extracted.',
+                     self.documents),
+                    ('errors_total', 'Documents that failed.', self.errors),
+                    ('batches_total', 'Chunks sent to the workers.',
+                     self.batches)]:
+                lines += ['# HELP readability_%s %s' % (name, help),
+                          '# TYPE readability_%s counter' % name,
+                          'readability_%s %d' % (name, value)]
+            gauges = [('throughput', 'Documents per second over the last '
+                       '%g seconds.' % self.window, throughput),
+                      ('uptime_seconds', 'Seconds since the server started.',
+                       time.time() - self.started)] + list(gauges)
+            for name, help, value in gauges:
+                lines += ['# HELP readability_%s %s' % (name, help),
+                          '# TYPE readability_%s gauge' % name,
+                          'readability_%s %g' % (name, value)]
+            for name, help, histogram in [
+                    ('request_seconds', 'Time from request to response.',
+                     self.latency),
+                    ('extraction_seconds', 'Time a worker took per document.',
+                     self.extraction)]:
+                lines += ['# HELP readability_%s %s' % (name, help),
+                          '# TYPE readability_%s histogram' % name]
+                lines += histogram.lines('readability_' + name)
+        return '\n'.join(lines) + '\n'
+
+
+class Job(object):
+    """A document waiting for its result"""
+
+    def __init__(self, html, options):
+        self.item = (html, options)
+        self.size = len(html)
+        self.result = None
+        self._done = threading.Event()
+
+    def finish(self, result):
+        self.result = result
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """The BatchResult, or None if it did not come within timeout"""
+        self._done.wait(timeout)
+        return self.result
+
+
+# Put on the queue by shutdown() for the dispatcher to stop.
+_STOP = object()
+
+
+def _warm_up():
+    # Imports, regexps and parser set up before the first request.
+    Document('<html><head><title>Warm up</title></head><body><p>%s</p>'
+             '</body></html>' % ('Some text, to warm up. ' * 20)).summary()
+
+
+class ExtractionServer(object):
+    """Documents submitted from any thread, extracted by a pool of worker
+    processes, and served over HTTP by serve_forever().
+
+    :param address: (host, port) to listen on, port 0 picking a free one.
+    :param unix_socket: path of a Unix socket to listen on instead.
+    :param processes: worker processes, the number of CPUs by default.
+    :param max_queue: documents waiting for a worker before more are turned
+      away.
+    :param max_request_bytes: largest request body accepted.
+    :param batch_size: documents sent to a worker at a time, 1 for no
+      batching.
+    :param batch_wait: seconds to wait for more small documents to batch.
+    :param batch_max_bytes: largest document batched with others.
+    :param timeout: seconds allowed per document, see extract_batch().
+    :param options: Document options of every document, which requests may
+      override.
+    :param maxtasksperchild: see extract_batch().
+    :param result_timeout: seconds a chunk sent to a worker, and a request,
+      wait for their results before giving up, in case the worker died.
+    """
+
+    def __init__(self, address=('127.0.0.1', 8000), unix_socket=None,
+                 processes=None, max_queue=64, max_request_bytes=10 << 20,
+                 batch_size=1, batch_wait=0.005, batch_max_bytes=32 << 10,
+                 timeout=None, options=None, maxtasksperchild=None,
+                 result_timeout=300):
+        self.address = address
+        self.unix_socket = unix_socket
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_request_bytes = max_request_bytes
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.batch_max_bytes = batch_max_bytes
+        self.timeout = timeout
+        self.options = options or {}
+        self.maxtasksperchild = maxtasksperchild
+        self.result_timeout = result_timeout
+        self.metrics = Metrics()
+        self.queue = queue.Queue(max_queue)
+        self.in_flight = 0
+        self.pool = None
+        self.httpd = None
+        # Keep every worker busy, with the rest of the documents queued.
+        self._slots = threading.Semaphore(self.processes * 2)
+        self._lock = threading.Lock()
+        # chunks sent to the workers, by number: (deadline, jobs)
+        self._pending = {}
+        self._chunks = 0
+        self._dispatcher = None
+        self._serving = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def submit(self, html, options=None):
+        """Queue a document, raising queue.Full if too many are waiting"""
+        item_options = dict(self.options)
+        item_options.update(options or {})
+        job = Job(html, item_options)
+        self.queue.put_nowait(job)
+        return job
+
+    def start(self):
+        """Start the workers, then the dispatcher and the HTTP server"""
+        # Workers are forked before there are any threads to fork.
+        self.pool = multiprocessing.Pool(
+            self.processes, initializer=_warm_up,
+            maxtasksperchild=self.maxtasksperchild)
+        self._dispatcher = threading.Thread(target=self._dispatch)
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+        if self.unix_socket is not None:
+            if os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)
+            self.httpd = ThreadingUnixHTTPServer(self.unix_socket,
+                                                 RequestHandler)
+        else:
+            self.httpd = ThreadingHTTPServer(self.address, RequestHandler)
+            self.address = self.httpd.server_address[:2]
+        self.httpd.extraction = self
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop serving, then stop the dispatcher and the workers"""
+        if self.httpd is not None:
+            if self._serving is not None:
+                self.httpd.shutdown()
+                self._serving = None
+            self.httpd.server_close()
+            if self.unix_socket is not None and \
+                    os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)
+            self.httpd = None
+        if self._dispatcher is not None:
+            self.queue.put(_STOP)
+            self._dispatcher.join()
+            self._dispatcher = None
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def serve_in_thread(self):
+        """Serve from a daemon thread, for tests and embedding"""
+        self._serving = threading.Thread(target=self.serve_forever)
+        self._serving.daemon = True
+        self._serving.start()
+        return self
+
+    def gauges(self):
+        return [('queue_depth', 'Documents waiting for a worker.',
+                 self.queue.qsize()),
+                ('in_flight', 'Documents being extracted.', self.in_flight),
+                ('workers', 'Worker processes.', self.processes)]
+
+    def _batch(self, job):
+        """job and the small jobs following it within batch_wait, and the
+        job that ended the batch if it could not be part of it"""
+        jobs = [job]
+        if self.batch_size <= 1 or job.size > self.batch_max_bytes:
+            return jobs, None
+        deadline = time.time() + self.batch_wait
+        while len(jobs) < self.batch_size:
+            try:
+                job = self.queue.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            if job is _STOP or job.size > self.batch_max_bytes:
+                return jobs, job
+            jobs.append(job)
+        return jobs, None
+
+    def _dispatch(self):
+        carried = None
+        while True:
+            if carried is not None:
+                job, carried = carried, None
+            else:
+                try:
+                    job = self.queue.get(timeout=EXPIRE_INTERVAL)
+                except queue.Empty:
+                    self._expire()
+                    continue
+            if job is _STOP:
+                return
+            jobs, carried = self._batch(job)
+            while not self._slots.acquire(timeout=EXPIRE_INTERVAL):
+                self._expire()
+            with self._lock:
+                self.in_flight += len(jobs)
+                number = self._chunks
+                self._chunks += 1
+                self._pending[number] = (time.time() + self.result_timeout,
+                                         jobs)
+            chunk = [(index, job.item) for index, job in enumerate(jobs)]
+            self.pool.apply_async(
+                _extract_chunk, (chunk, self.timeout),
+                callback=lambda results, number=number:
+                    self._finished(number, results),
+                error_callback=lambda error, number=number:
+                    self._failed(number, error))
+
+    def _expire(self):
+        """Give up on the chunks whose worker never answered, a worker
+        killed in the middle of one never calling back"""
+        now = time.time()
+        with self._lock:
+            expired = [number for number, (deadline, jobs)
+                       in self._pending.items() if deadline < now]
+        for number in expired:
+            self._failed(number, 'no result within %s seconds'
+                         % self.result_timeout, 'WorkerLost')
+
+    def _finished(self, number, results):
+        with self._lock:
+            deadline, jobs = self._pending.pop(number, (None, None))
+            if jobs is None:
+                # given up on already
+                return
+            self.in_flight -= len(jobs)
+        self._slots.release()
+        self.metrics.batch(results)
+        for result in results:
+            jobs[result.index].finish(result)
+
+    def _failed(self, number, error, kind=None):
+        # The chunk never made it through a worker.
+        with self._lock:
+            deadline, jobs = self._pending.get(number, (None, []))
+        self._finished(number, [
+            BatchResult(index, None, None, None, '%s: %s' % (
+                kind or error.__class__.__name__, error), 0.0)
+            for index in range(len(jobs))])
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return self.server.server_address
+
+    def log_message(self, format, *args):
+        zlog.debug('%s %s', self.address_string(), format % args)
+
+    def respond(self, code, body, content_type='application/json',
+                headers=()):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.extraction.metrics.request(code, time.time() - self.start)
+
+    def error(self, code, message, headers=()):
+        self.respond(code, json.dumps({'error': message}), headers=headers)
+
+    def do_GET(self):
+        self.start = time.time()
+        path = urlsplit(self.path).path
+        extraction = self.server.extraction
+        if path == '/health':
+            self.respond(200, 'ok\n', 'text/plain')
+        elif path == '/metrics':
+            self.respond(200, extraction.metrics.render(extraction.gauges()),
+                         'text/plain; version=0.0.4')
+        else:
+            self.error(404, 'not found')
+
+    def do_POST(self):
+        self.start = time.time()
+        url = urlsplit(self.path)
+        extraction = self.server.extraction
+        if url.path != '/extract':
+            self.close_connection = True
+            return self.error(404, 'not found')
+        try:
+            length = int(self.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            self.close_connection = True
+            return self.error(411, 'Content-Length required')
+        if length < 0:
+            self.close_connection = True
+            return self.error(400, 'negative Content-Length')
+        if length > extraction.max_request_bytes:
+            self.close_connection = True
+            return self.error(413, 'larger than %d bytes' %
+                              extraction.max_request_bytes)
+        body = self.rfile.read(length)
+        try:
+            html, options = self.document(body, parse_qsl(url.query))
+        except ValueError as e:
+            return self.error(400, str(e))
+        try:
+            job = extraction.submit(html, options)
+        except queue.Full:
+            return self.error(503, 'too many documents waiting',
+                              headers=[('Retry-After', '1')])
+        result = job.wait(extraction.result_timeout)
+        if result is None:
+            return self.error(504, 'no result within %s seconds'
+                              % extraction.result_timeout)
+        code = 200
+        if result.error:
+            code = 504 if result.error.startswith('DocumentTimeout') else 422
+        self.respond(code, json.dumps({
+            'summary': result.summary, 'title': result.title,
+            'short_title': result.short_title, 'error': result.error,
+            'elapsed': round(result.elapsed, 6)}))
+
+    def document(self, body, query):
+        """(html, options) of a request"""
+        content_type = self.headers.get('Content-Type', '')
+        media_type = content_type.split(';')[0].strip().lower()
+        if media_type == 'application/json':
+            record = json.loads(body.decode('utf-8'))
+            if not isinstance(record, dict) or \
+                    not isinstance(record.get('html'), str):
+                raise ValueError('expected an object with the html')
+            html = record.pop('html')
+            return html, request_options(query + sorted(record.items()))
+        options = request_options(query)
+        for param in content_type.split(';')[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'charset' and value.strip():
+                options.setdefault('charset', value.strip().strip('"'))
+        return body, options
+
+
+def main():
+    from optparse import OptionParser
+    parser = OptionParser(usage="%prog: [options]")
+    parser.add_option('--host', default='127.0.0.1')
+    parser.add_option('-p', '--port', type='int', default=8000)
+    parser.add_option('--unix-socket', default=None,
+                      help="listen on this Unix socket instead")
+    parser.add_option('-j', '--workers', type='int', default=None,
+                      help="number of worker processes")
+    parser.add_option('--queue', type='int', default=64,
+                      help="documents waiting before requests are turned away")
+    parser.add_option('--max-request-bytes', type='int', default=10 << 20)
+    parser.add_option('--batch-size', type='int', default=1,
+                      help="small documents sent to a worker at a time")
+    parser.add_option('--batch-wait', type='float', default=0.005,
+                      help="seconds to wait for a batch to fill")
+    parser.add_option('--batch-max-bytes', type='int', default=32 << 10,
+                      help="largest document batched with others")
+    parser.add_option('--timeout', type='float', default=None,
+                      help="seconds allowed per document")
+    parser.add_option('--maxtasksperchild', type='int', default=None)
+    parser.add_option('--result-timeout', type='float', default=300,
+                      help="seconds to wait for a worker before giving up")
+    parser.add_option('--max-bytes', type='int', default=None,
+                      help="only parse the start of every document")
+    parser.add_option('--max-nodes', type='int', default=None,
+                      help="only keep the first nodes of every document")
+    parser.add_option('--time-budget', type='float', default=None,
+                      help="seconds after which a document is cut short")
+    parser.add_option('-v', '--verbose', action='store_true')
+    (options, args) = parser.parse_args()
+
+    if options.verbose:
+        zlog.addHandler(logging.StreamHandler())
+        zlog.setLevel(logging.DEBUG)
+
+    budgets = {}
+    for name in ['max_bytes', 'max_nodes', 'time_budget']:
+        if getattr(options, name) is not None:
+            budgets[name] = getattr(options, name)
+
+    server = ExtractionServer(
+        address=(options.host, options.port),
+        unix_socket=options.unix_socket, processes=options.workers,
+        max_queue=options.queue,
+        max_request_bytes=options.max_request_bytes,
+        batch_size=options.batch_size, batch_wait=options.batch_wait,
+        batch_max_bytes=options.batch_max_bytes, timeout=options.timeout,
+        options=budgets, maxtasksperchild=options.maxtasksperchild,
+        result_timeout=options.result_timeout)
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    server.start()
+    sys.stderr.write('Serving on %s\n' % (
+        options.unix_socket or 'http://%s:%d/' % tuple(server.address)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Objects such as caches and indexes given as Document options, that stay a
+single object per process when sent to batch workers.
+
+Pickling them for every item would give every document a fresh copy, so
+they pickle as their settings and a token instead, and the first item a
+worker unpickles makes the copy all its other items use.
+"""
+import uuid
+import weakref
+
+# Instances pickled by this process, by token, for as long as they are in
+# use, and the copies unpickled in this worker, kept for its lifetime.
+_pickled = weakref.WeakValueDictionary()
+_instances = {}
+
+
+def _shared_instance(cls, token, settings):
+    instance = _pickled.get(token)
+    if instance is None:
+        instance = _instances.get(token)
+    if instance is None:
+        instance = cls(**settings)
+        instance.token = token
+        _instances[token] = instance
+    return instance
+
+
+class ProcessShared(object):
+    """Base of the objects shared this way.
+
+    Subclasses must implement settings(), returning the keyword arguments
+    that recreate them empty in a worker.
+    """
+
+    token = None
+
+    def settings(self):
+        raise NotImplementedError(
+            '%s must implement settings()' % self.__class__.__name__)
+
+    def __reduce__(self):
+        if self.token is None:
+            self.token = uuid.uuid4().hex
+        _pickled[self.token] = self
+        return _shared_instance, (self.__class__, self.token, self.settings())
@@ -0,0 +1,104 @@
+"""
+Instrumentation of the extraction pipeline.
+
+Pass an object with stage() and count() methods, such as Stats, as the
+stats option of Document to be told how long every stage took and how the
+tree changed:
+
+    stats = Stats()
+    for html in pages:
+        Document(html, stats=stats).summary()
+    print(stats.totals())
+
+Without it the stages cost next to nothing extra.
+"""
+import time
+
+
+class Stats(object):
+    """Collects the stages and counters of one or more documents, summed
+    per stage name so that any number of documents take the same memory.
+
+    :param count_nodes: count the nodes of the tree before and after every
+      stage, which means walking the tree twice more per stage.
+
+    stages maps every stage name to a dict of its runs, seconds and the
+    nodes_before and nodes_after it, summed over the runs they were counted
+    for and None if never counted.
+    """
+
+    def __init__(self, count_nodes=True):
+        self.count_nodes = count_nodes
+        self.stages = {}
+        self.counters = {}
+
+    def stage(self, name, elapsed, nodes_before, nodes_after):
+        """Called at the end of every stage, node counts are None when not
+        counted or when there was no tree."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'runs': 0, 'seconds': 0.0,
+                                         'nodes_before': None,
+                                         'nodes_after': None}
+        stage['runs'] += 1
+        stage['seconds'] += elapsed
+        if nodes_before is not None:
+            stage['nodes_before'] = (stage['nodes_before'] or 0) + nodes_before
+        if nodes_after is not None:
+            stage['nodes_after'] = (stage['nodes_after'] or 0) + nodes_after
+
+    def count(self, name, value=1):
+        """Called for events such as candidates found or retries."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def totals(self):
+        """Total seconds spent per stage name"""
+        return dict((name, stage['seconds'])
+                    for name, stage in self.stages.items())
+
+
+def count_nodes(node):
+    if node is None:
+        return None
+    return sum(1 for _ in node.iter())
+
+
+class StageTimer(object):
+    """Times a stage and reports it to stats on exit.
+
+    The tree is the one given, or the one assigned to node within the
+    with block when the stage builds a new tree.
+    """
+
+    def __init__(self, stats, name, node=None):
+        self.stats = stats
+        self.name = name
+        self.node = node
+        self.counted = getattr(stats, 'count_nodes', False)
+
+    def __enter__(self):
+        self.before = count_nodes(self.node) if self.counted else None
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.time() - self.start
+        after = count_nodes(self.node) if self.counted else None
+        self.stats.stage(self.name, elapsed, self.before, after)
+        return False
+
+
+class NullStage(object):
+    """Stands for StageTimer when there are no stats to report to"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_STAGE = NullStage()
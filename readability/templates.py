@@ -0,0 +1,138 @@
+"""
+Per-domain templates: where the article was found on a site's earlier
+pages, tried first on its next ones.
+
+    templates = TemplateCache(path='templates.json')
+    for url, html in pages:
+        Document(html, url=url, templates=templates).summary()
+    templates.save()
+
+A template is the (tag, id, class) path from the root of the page to the
+best candidate, and whether it was found with unlikely candidates removed.
+Pages where the element it locates is too short or has too many links go
+through the full scoring, which updates the template.
+"""
+import json
+import os
+
+from .lru import LRUCache
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+
+def domain_of(domain=None, url=None):
+    """The given domain, or else the host of url, lowercased"""
+    if not domain and url:
+        domain = urlparse(url).hostname
+    return domain.lower() if domain else None
+
+
+def _step(elem):
+    return elem.tag, elem.get('id', ''), elem.get('class', '')
+
+
+def locate(elem):
+    """(tag, id, class) path from the root of the tree to elem"""
+    path = []
+    while elem is not None:
+        path.append(_step(elem))
+        elem = elem.getparent()
+    path.reverse()
+    return path
+
+
+def find(doc, locator):
+    """The element at the end of locator in doc, taking the first matching
+    child at every step, or None"""
+    if not locator or tuple(locator[0]) != _step(doc):
+        return None
+    elem = doc
+    for step in locator[1:]:
+        step = tuple(step)
+        for child in elem.iterchildren():
+            if _step(child) == step:
+                elem = child
+                break
+        else:
+            return None
+    return elem
+
+
+class TemplateCache(object):
+    """Templates of the most recently seen domains.
+
+    :param maxsize: number of domains kept.
+    :param path: JSON file the templates are loaded from if it exists, and
+      saved to by save().
+    :param min_text_length: shortest text of a templated element.
+    :param max_link_density: highest link density of a templated element.
+
+    hits counts the pages a template was used for, misses the pages of
+    domains without one, and rejected the templates that did not locate a
+    valid element.
+    """
+
+    def __init__(self, maxsize=10000, path=None, min_text_length=250,
+                 max_link_density=0.5):
+        self.path = path
+        self.min_text_length = min_text_length
+        self.max_link_density = max_link_density
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self._templates = LRUCache(maxsize)
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, domain):
+        """The template of domain, a dict with the path locating the
+        article and whether it was found in a ruthless pass, or None"""
+        return self._templates.get(domain)
+
+    def set(self, domain, locator, ruthless=True):
+        self._templates.set(domain, {
+            'path': [list(step) for step in locator],
+            'ruthless': ruthless,
+        })
+
+    def lookup(self, domain, doc):
+        """The element the template of domain locates in doc, or None"""
+        template = self.get(domain)
+        if template is None:
+            self.misses += 1
+            return None
+        elem = find(doc, template['path'])
+        if elem is None:
+            self.rejected += 1
+        return elem
+
+    def validated(self, domain, valid):
+        """Count whether the element found by lookup() was used"""
+        if valid:
+            self.hits += 1
+        else:
+            self.rejected += 1
+
+    def hit_rate(self):
+        pages = self.hits + self.misses + self.rejected
+        return float(self.hits) / pages if pages else 0.0
+
+    def load(self, path=None):
+        with open(path or self.path) as f:
+            for domain, template in json.load(f):
+                self.set(domain, template['path'], template['ruthless'])
+
+    def save(self, path=None):
+        """Write the templates, least recently used first, to path or to
+        the file given when created"""
+        path = path or self.path
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(self._templates.items(), f)
+        os.rename(tmp, path)
@@ -0,0 +1,212 @@
+"""
+Per-element text statistics for the scoring and sanitizing code.
+
+The text_content() of an element is its own text followed, for every child,
+by the child's text_content() and tail.  Every string is summarized in a form
+that can be joined the same way, so the index is filled bottom-up in a single
+pass and dropping a node only means joining its ancestors' children again.
+The descendants of a few tags sanitizing looks at are counted in that pass too.
+"""
+import re
+
+from lxml.etree import Comment
+from lxml.etree import Entity
+from lxml.etree import ProcessingInstruction
+
+from .cleaners import clean
+
+NON_ELEMENTS = (Comment, Entity, ProcessingInstruction)
+
+spaces_and_tabs = re.compile('[ \t]{2,}')
+
+# Fields of a record kept for every node.
+CONTENT, TAIL, LINKS, DIRTY, KINDS = range(5)
+
+# Tags counted among the descendants of every element.
+KINDS_COUNTED = ['p', 'img', 'li', 'a', 'embed', 'input']
+KIND_INDEX = dict((tag, i) for i, tag in enumerate(KINDS_COUNTED))
+
+
+def summarize_spaces(s):
+    """Summarize a whitespace-only string.
+
+    Returns (has_newline, length once clean() collapsed it, leading spaces
+    and tabs, trailing spaces and tabs, made of spaces and tabs only).
+    """
+    lead = len(s) - len(s.lstrip(' \t'))
+    if lead == len(s):
+        return (False, 1, lead, lead, True)
+    trail = len(s) - len(s.rstrip(' \t'))
+    return ('\n' in s, len(spaces_and_tabs.sub(' ', s)), lead, trail, False)
+
+
+def join_spaces(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    # clean() turns any run of two or more spaces and tabs into one space,
+    # so two runs meeting at the boundary lose one character.
+    length = a[1] + b[1] - (1 if a[3] and b[2] else 0)
+    lead = a[2] + b[2] if a[4] else a[2]
+    trail = a[3] + b[3] if b[4] else b[3]
+    return (a[0] or b[0], length, lead, trail, a[4] and b[4])
+
+
+def summarize(s):
+    """Summarize a string as (leading whitespace, length of the cleaned text
+    between the first and last non-space characters or -1 if there are none,
+    trailing whitespace, number of commas).  Empty strings give None.
+    """
+    if not s:
+        return None
+    core = s.strip()
+    if not core:
+        return (summarize_spaces(s), -1, None, 0)
+    lead = len(s) - len(s.lstrip())
+    trail = len(s) - len(s.rstrip())
+    return (summarize_spaces(s[:lead]) if lead else None,
+            len(clean(core)),
+            summarize_spaces(s[len(s) - trail:]) if trail else None,
+            core.count(','))
+
+
+def join(a, b):
+    """Summary of the concatenation of the strings summarized by a and b"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a[1] < 0:
+        if b[1] < 0:
+            return (join_spaces(a[0], b[0]), -1, None, 0)
+        return (join_spaces(a[0], b[0]), b[1], b[2], b[3])
+    if b[1] < 0:
+        return (a[0], a[1], join_spaces(a[2], b[0]), a[3])
+    gap = join_spaces(a[2], b[0])
+    if gap is None:
+        gap_length = 0
+    elif gap[0]:
+        gap_length = 1
+    else:
+        gap_length = gap[1]
+    return (a[0], a[1] + gap_length + b[1], b[2], a[3] + b[3])
+
+
+def length(summary):
+    if summary is None or summary[1] < 0:
+        return 0
+    return summary[1]
+
+
+class TextIndex(object):
+    """Cleaned text length, comma count, link text length and descendant tag
+    counts per element.
+
+    Records are computed lazily for the subtree being asked about and reused
+    afterwards.  Nodes must be removed through drop_tree() and any other
+    structural change reported through invalidate(), otherwise the records of
+    the ancestors go stale.
+    """
+
+    def __init__(self):
+        self._records = {}
+
+    def text_length(self, elem):
+        """Same as len(clean(elem.text_content()))"""
+        return length(self._record(elem)[CONTENT])
+
+    def comma_count(self, elem):
+        content = self._record(elem)[CONTENT]
+        return 0 if content is None else content[3]
+
+    def link_length(self, elem):
+        """Sum of text_length() over all the <a> descendants"""
+        return self._record(elem)[LINKS]
+
+    def is_empty(self, elem):
+        """Same as elem.text_content().strip() == ''"""
+        content = self._record(elem)[CONTENT]
+        return content is None or content[1] < 0
+
+    def tag_counts(self, elem):
+        """Number of descendants per tag of KINDS_COUNTED, as a dict"""
+        kinds = self._record(elem)[KINDS]
+        if kinds is None:
+            return dict((tag, 0) for tag in KINDS_COUNTED)
+        return dict(zip(KINDS_COUNTED, kinds))
+
+    def columns(self, elems):
+        """Lists of text_length(), comma_count() and link_length() of elems"""
+        records = [self._record(elem) for elem in elems]
+        contents = [record[CONTENT] for record in records]
+        return ([length(content) for content in contents],
+                [0 if content is None else content[3] for content in contents],
+                [record[LINKS] for record in records])
+
+    def drop_tree(self, elem):
+        parent = elem.getparent()
+        previous = elem.getprevious()
+        elem.drop_tree()
+        # drop_tree() moves the tail onto the previous sibling, or into the
+        # parent's text which is summarized again with the parent.
+        if previous is not None:
+            record = self._records.get(previous)
+            if record is not None:
+                record[TAIL] = summarize(previous.tail)
+        self.invalidate(parent)
+
+    def invalidate(self, elem):
+        """Mark elem and its ancestors for recomputation"""
+        records = self._records
+        while elem is not None:
+            record = records.get(elem)
+            if record is None or record[DIRTY]:
+                break
+            record[DIRTY] = True
+            elem = elem.getparent()
+
+    def _record(self, elem):
+        records = self._records
+        record = records.get(elem)
+        if record is not None and not record[DIRTY]:
+            return record
+        stack = [(elem, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._compute(node)
+                continue
+            record = records.get(node)
+            if record is not None and not record[DIRTY]:
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in node)
+        return records[elem]
+
+    def _compute(self, node):
+        records = self._records
+        if node.tag in NON_ELEMENTS:
+            records[node] = [None, summarize(node.tail), 0, False, None]
+            return
+        content = summarize(node.text)
+        links = 0
+        kinds = None
+        for child in node:
+            record = records[child]
+            content = join(join(content, record[CONTENT]), record[TAIL])
+            links += record[LINKS]
+            tag = child.tag
+            if tag == 'a':
+                links += length(record[CONTENT])
+            child_kinds = record[KINDS]
+            kind = KIND_INDEX.get(tag)
+            if child_kinds is not None or kind is not None:
+                if kinds is None:
+                    kinds = [0] * len(KINDS_COUNTED)
+                if child_kinds is not None:
+                    for i, count in enumerate(child_kinds):
+                        kinds[i] += count
+                if kind is not None:
+                    kinds[kind] += 1
+        records[node] = [content, summarize(node.tail), links, False, kinds]
@@ -0,0 +1,153 @@
+"""
+Candidate scoring with NumPy, on trees flattened into arrays, for one or
+many documents at once.
+
+    trees = [flatten(doc.html, TextIndex(), doc.class_weight) for doc in docs]
+    for tree, best in zip(trees, best_candidates(trees)):
+        ...
+
+The scores, the candidates and their order are those of
+Document.score_paragraphs(): paragraph scores are added to their parents
+and grandparents in the same order, so that the sums round the same way,
+and candidates are listed in the order they are first met.
+"""
+import lxml.etree
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PARAGRAPH_TAGS = ['p', 'pre', 'td']
+
+# Bonus of a candidate by tag, as in Document.score_node().
+TAG_BONUS = {'div': 5}
+TAG_BONUS.update(dict.fromkeys(['pre', 'td', 'blockquote'], 3))
+TAG_BONUS.update(dict.fromkeys(['address', 'ol', 'ul', 'dl', 'dd', 'dt', 'li',
+                                'form'], -3))
+TAG_BONUS.update(dict.fromkeys(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'th'], -5))
+
+
+class FlatTree(object):
+    """Elements of a tree in document order, and per element arrays of:
+
+    parent: index of the parent, -1 for none.
+    paragraph: 1 + position of the tag in PARAGRAPH_TAGS, 0 for others.
+    weight: class weight plus tag bonus, the score a candidate starts with.
+    text_length, commas, link_length: as TextIndex gives them.
+
+    The elements scored are the descendants of the element at root.
+    """
+
+    def __init__(self, nodes, root, parent, paragraph, weight, text_length,
+                 commas, link_length):
+        self.nodes = nodes
+        self.root = root
+        self.parent = parent
+        self.paragraph = paragraph
+        self.weight = weight
+        self.text_length = text_length
+        self.commas = commas
+        self.link_length = link_length
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def flatten(root, index, class_weight):
+    """FlatTree of root, whose parent is kept too as it may be a
+    candidate.
+
+    :param index: TextIndex of the tree.
+    :param class_weight: function giving the class weight of an element.
+    """
+    nodes = []
+    parents = []
+    outer = root.getparent()
+    if outer is not None:
+        nodes.append(outer)
+        parents.append(-1)
+    position = dict((node, i) for i, node in enumerate(nodes))
+    for elem in root.iter(lxml.etree.Element):
+        position[elem] = len(nodes)
+        nodes.append(elem)
+        parents.append(position.get(elem.getparent(), -1))
+    paragraph_codes = dict((tag, i + 1) for i, tag in enumerate(PARAGRAPH_TAGS))
+    paragraph = [paragraph_codes.get(elem.tag, 0) for elem in nodes]
+    weight = [class_weight(elem) + TAG_BONUS.get(elem.tag.lower(), 0)
+              for elem in nodes]
+    text_length, commas, link_length = index.columns(nodes)
+    array = numpy.array
+    return FlatTree(nodes, len(nodes) - len(position) + position[root],
+                    array(parents, dtype=numpy.int64),
+                    array(paragraph, dtype=numpy.int8),
+                    array(weight, dtype=numpy.float64),
+                    array(text_length, dtype=numpy.int64),
+                    array(commas, dtype=numpy.int64),
+                    array(link_length, dtype=numpy.int64))
+
+
+def score_trees(trees, min_text_length=25):
+    """(indexes of the candidates in trees[i].nodes, in the order they are
+    first met, and their scores) for every tree, in one pass over all"""
+    offsets = numpy.cumsum([0] + [len(tree) for tree in trees])
+    parent = numpy.concatenate([
+        numpy.where(tree.parent >= 0, tree.parent + offset, -1)
+        for tree, offset in zip(trees, offsets)])
+    paragraph = numpy.concatenate([tree.paragraph for tree in trees])
+    text_length = numpy.concatenate([tree.text_length for tree in trees])
+    commas = numpy.concatenate([tree.commas for tree in trees])
+    link_length = numpy.concatenate([tree.link_length for tree in trees])
+    weight = numpy.concatenate([tree.weight for tree in trees])
+    tree_of = numpy.repeat(numpy.arange(len(trees)), [len(t) for t in trees])
+
+    # The paragraphs of every tree, p then pre then td, each in document
+    # order, like Document.tags().
+    scored = numpy.zeros(len(parent), dtype=bool)
+    for tree, offset in zip(trees, offsets):
+        scored[offset + tree.root + 1:offset + len(tree)] = True
+    positions = numpy.flatnonzero(
+        scored & (paragraph > 0) & (parent >= 0) &
+        (text_length >= min_text_length))
+    positions = positions[numpy.lexsort(
+        (positions, paragraph[positions], tree_of[positions]))]
+
+    scores = 2 + commas[positions] + numpy.minimum(
+        text_length[positions] / 100.0, 3)
+    parents = parent[positions]
+    grand_parents = parent[parents]
+    # parent then grandparent of every paragraph, in order
+    targets = numpy.stack([parents, grand_parents], axis=1).ravel()
+    values = numpy.stack([scores, scores / 2.0], axis=1).ravel()
+    kept = targets >= 0
+    targets = targets[kept]
+    values = values[kept]
+
+    totals = weight.copy()
+    numpy.add.at(totals, targets, values)
+    candidates, first = numpy.unique(targets, return_index=True)
+    candidates = candidates[numpy.argsort(first, kind='stable')]
+    density = link_length[candidates] / numpy.maximum(
+        text_length[candidates], 1).astype(numpy.float64)
+    candidate_scores = totals[candidates] * (1 - density)
+
+    # numpy.unique sorted by position, so trees are in order
+    belongs = tree_of[candidates]
+    results = []
+    for number, offset in enumerate(offsets[:-1]):
+        mine = belongs == number
+        results.append((candidates[mine] - offset, candidate_scores[mine]))
+    return results
+
+
+def best_candidates(trees, min_text_length=25):
+    """(index in trees[i].nodes, score) of the best candidate of every
+    tree, None for trees without any, ties going to the first met"""
+    best = []
+    for nodes, scores in score_trees(trees, min_text_length):
+        if not len(nodes):
+            best.append(None)
+            continue
+        i = numpy.argsort(-scores, kind='stable')[0]
+        best.append((int(nodes[i]), float(scores[i])))
+    return best
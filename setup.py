@@ -16,6 +16,12 @@ setup(
         "chardet",
         "lxml"
         ],
+    extras_require={
+        # faster hashing of the pages for readability.cache
+        "cache": ["xxhash"],
+        # scoring with readability.vectorized
+        "vectorized": ["numpy"],
+        },
     classifiers=[
         "Environment :: Web Environment",
         "Intended Audience :: Developers",
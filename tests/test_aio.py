@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+
+from readability import Document
+from readability.aio import AsyncExtractor
+
+from .utils import load_sample
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        await asyncio.sleep(0)
+        yield data[start:start + size]
+
+
+class TestAsyncExtractor(unittest.TestCase):
+    """Streamed extraction should give the same results as Document"""
+
+    def test_summary(self):
+        sample = load_sample('si-game.sample.html', 'rb')
+        expected = Document(sample).summary()
+
+        async def run():
+            extractor = AsyncExtractor(max_concurrency=2)
+            return await asyncio.gather(*[
+                extractor.summary(chunked(sample, size))
+                for size in (1000, 4093, len(sample))])
+
+        for summary in asyncio.run(run()):
+            self.assertEqual(expected, summary)
+
+    def test_multibyte_split(self):
+        """Chunks may split characters in the middle"""
+        page = (u'<html><head><title>Caf\xe9 — r\xe9sum\xe9</title>'
+                u'</head><body><p>\xe9</p></body></html>').encode('utf-8')
+
+        async def run():
+            doc = await AsyncExtractor().document(chunked(page, 3),
+                                                  encoding='utf-8')
+            return doc.title()
+
+        self.assertEqual(u'Caf\xe9 - r\xe9sum\xe9', asyncio.run(run()))
+
+    def test_concurrent_documents(self):
+        """Every parser stays in one thread, however many run at once"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        sample = load_sample('si-game.sample.html', 'rb')
+        pages = [sample.replace(b'<title>', b'<title>%d ' % i, 1)
+                 for i in range(12)]
+        threads = {}
+        parsers = []
+        extractor = AsyncExtractor(max_concurrency=8,
+                                   executor=ThreadPoolExecutor(8))
+        feed = extractor._feed
+
+        def recording_feed(parser, decoder, chunk, final):
+            if id(parser) not in threads:
+                # kept alive so that ids are not reused
+                parsers.append(parser)
+            threads.setdefault(id(parser), set()).add(threading.get_ident())
+            feed(parser, decoder, chunk, final)
+
+        extractor._feed = recording_feed
+
+        async def run():
+            return await asyncio.gather(*[
+                extractor.document(chunked(page, 512)) for page in pages])
+
+        docs = asyncio.run(run())
+        for i, doc in enumerate(docs):
+            self.assertEqual(Document(pages[i]).title(), doc.title())
+            self.assertEqual(Document(pages[i]).summary(), doc.summary())
+        self.assertEqual(12, len(threads))
+        self.assertEqual([1] * 12, [len(t) for t in threads.values()])
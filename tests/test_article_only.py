@@ -1,15 +1,8 @@
-import os
 import unittest
 
 from readability import Document
 
-
-SAMPLES = os.path.join(os.path.dirname(__file__), 'samples')
-
-
-def load_sample(filename):
-    """Helper to get the content out of the sample files"""
-    return open(os.path.join(SAMPLES, filename)).read()
+from .utils import load_sample
 
 
 class TestArticleOnly(unittest.TestCase):
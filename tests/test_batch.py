@@ -0,0 +1,122 @@
+import os
+import unittest
+
+from readability import Document
+from readability import extract_batch
+
+from .utils import load_sample
+
+
+class Exit(object):
+    """Kills the worker unpickling it"""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class TestBatch(unittest.TestCase):
+    """extract_batch should match Document and isolate failures"""
+
+    def test_ordered_results(self):
+        sample = load_sample('si-game.sample.html')
+        items = [sample, '', (sample, {'html_partial': True})]
+        results = list(extract_batch(items, processes=2))
+        self.assertEqual([0, 1, 2], [r.index for r in results])
+
+        self.assertEqual(Document(sample).summary(), results[0].summary)
+        self.assertEqual(Document(sample).short_title(),
+                         results[0].short_title)
+        self.assertEqual(None, results[0].error)
+        self.assertTrue(results[1].error.startswith('Unparseable'))
+        self.assertEqual(None, results[1].summary)
+        self.assertTrue(results[2].summary.startswith('<div>'))
+
+    def test_unordered_results(self):
+        sample = load_sample('si-game.sample.html')
+        results = list(extract_batch([sample] * 5, processes=2, chunksize=2,
+                                     ordered=False, maxtasksperchild=1))
+        self.assertEqual(list(range(5)), sorted(r.index for r in results))
+        self.assertEqual(1, len(set(r.summary for r in results)))
+
+    def test_timeout(self):
+        page = '<html><body>%s</body></html>' % (
+            '<div><p>Some words, more words and more words.</p></div>' * 20000)
+        results = list(extract_batch([page], processes=1, timeout=0.01))
+        self.assertTrue(results[0].error.startswith('DocumentTimeout'))
+
+    def test_lost_worker(self):
+        # a chunk whose worker died never calls back
+        page = '<html><head><title>Kept</title></head></html>'
+        items = [page, (page, {'exit': Exit()}), page]
+        results = list(extract_batch(items, processes=1, result_timeout=0.5))
+        self.assertEqual([0, 1, 2], [r.index for r in results])
+        self.assertEqual(['Kept', None, 'Kept'], [r.title for r in results])
+        self.assertTrue(results[1].error.startswith('WorkerLost'))
+
+    def test_ordered_backpressure(self):
+        # results held back for the order count against the input read
+        sample = load_sample('si-game.sample.html')
+        read = []
+
+        def items():
+            for i in range(50):
+                read.append(i)
+                yield sample * 5 if i == 0 else ''
+
+        results = extract_batch(items(), processes=2)
+        self.assertEqual(0, next(results).index)
+        self.assertTrue(len(read) <= 4, read)
+        self.assertEqual(list(range(1, 50)), [r.index for r in results])
+
+
+class TestStream(unittest.TestCase):
+    """stream() should write a JSON line per record"""
+
+    def test_jsonl(self):
+        import io
+        import json
+        from readability.batch import iter_jsonl, stream
+
+        page = ('<html><head><title>A title</title></head><body>'
+                '<p><a href="/next">link</a></p></body></html>')
+        lines = [json.dumps({'url': 'http://example.com/a', 'html': page}),
+                 '', json.dumps({'url': 'http://example.com/b'})]
+        out = io.StringIO()
+        count, errors = stream(iter_jsonl(lines), out=out, processes=1)
+        self.assertEqual((2, 1), (count, errors))
+
+        first, second = [json.loads(l) for l in out.getvalue().splitlines()]
+        self.assertEqual('http://example.com/a', first['url'])
+        self.assertEqual('A title', first['title'])
+        self.assertTrue('http://example.com/next' in first['summary'])
+        self.assertEqual(None, first['error'])
+        self.assertEqual('http://example.com/b', second['url'])
+        self.assertTrue(second['error'])
+
+    def test_bad_records(self):
+        import io
+        import json
+        from readability.batch import iter_files, iter_jsonl, iter_paths
+        from readability.batch import stream
+
+        lines = [json.dumps({'url': 'http://example.com/a',
+                             'html': '<title>A title</title>'}),
+                 '{"url": "http://example.com/b", "html": ',
+                 json.dumps({'url': 'http://example.com/c',
+                             'html': '<title>C title</title>'})]
+        out = io.StringIO()
+        count, errors = stream(iter_jsonl(lines), out=out, processes=1)
+        self.assertEqual((3, 1), (count, errors))
+        first, second, third = [json.loads(l)
+                                for l in out.getvalue().splitlines()]
+        self.assertEqual('A title', first['title'])
+        self.assertEqual(2, second['line'])
+        self.assertTrue(second['error'].startswith('JSONDecodeError'))
+        self.assertEqual('C title', third['title'])
+
+        out = io.StringIO()
+        missing = os.path.join(os.path.dirname(__file__), 'no-such-*.html')
+        count, errors = stream(iter_files(iter_paths([missing])), out=out,
+                               processes=1)
+        self.assertEqual((1, 1), (count, errors))
+        self.assertEqual(missing, json.loads(out.getvalue())['path'])
@@ -0,0 +1,108 @@
+import pickle
+import unittest
+
+import lxml.html
+
+from readability import Document
+from readability.boilerplate import BoilerplateIndex
+from readability.boilerplate import fingerprint_blocks
+
+
+NOTICE = ('<div class="notice"><p>Sign up to our newsletter, and get the '
+          'stories of the day, the best reads of the week and the offers of '
+          'our partners in your inbox every single morning.</p></div>')
+
+
+def page(seed):
+    article = ''.join(
+        '<p>Paragraph %d of story %d, with enough words, commas, and text to '
+        'be counted as content by the scoring of paragraphs.</p>' % (i, seed)
+        for i in range(8))
+    return ('<html><body><div class="story">%s%s</div></body></html>' %
+            (article, NOTICE))
+
+
+class TestFingerprints(unittest.TestCase):
+
+    def fingerprints(self, html):
+        doc = lxml.html.document_fromstring(html)
+        return dict((elem.get('class') or elem.tag, fingerprint)
+                    for elem, fingerprint in fingerprint_blocks(doc))
+
+    def test_same_blocks(self):
+        first, second = self.fingerprints(page(1)), self.fingerprints(page(2))
+        self.assertEqual(first['notice'], second['notice'])
+        self.assertNotEqual(first['story'], second['story'])
+
+    def test_spaces_and_empty_blocks(self):
+        first = self.fingerprints('<div class="a"><p>some  text</p></div>'
+                                  '<div class="b"><img src="x.jpg"></div>')
+        second = self.fingerprints('<div class="a"><p>some\ntext </p></div>')
+        self.assertEqual(first['a'], second['a'])
+        self.assertFalse('b' in first)
+
+
+class TestBoilerplateIndex(unittest.TestCase):
+    """Blocks on most pages of a domain should be dropped"""
+
+    def test_summary(self):
+        index = BoilerplateIndex(threshold=0.5, min_documents=3)
+        for seed in range(5):
+            summary = Document(page(seed), domain='site',
+                               boilerplate=index).summary()
+            self.assertEqual(seed >= 2, 'newsletter' not in summary)
+            self.assertTrue('story %d' % seed in summary)
+        self.assertEqual(5, index.documents('site'))
+        self.assertTrue('newsletter' in Document(page(5)).summary())
+
+    def test_same_page(self):
+        # a page fetched again is counted once, its article never recurring
+        index = BoilerplateIndex(min_documents=10)
+        for _ in range(12):
+            summary = Document(page(0), domain='site',
+                               boilerplate=index).summary()
+            self.assertTrue('Paragraph 7 of story 0' in summary)
+        self.assertEqual(1, index.documents('site'))
+
+    def test_recurring_article(self):
+        # the same story under changing blocks is still the article
+        index = BoilerplateIndex(min_documents=3)
+        for seed in range(5):
+            html = page(0).replace(
+                '</body>', '<div class="aside"><p>Aside number %d, a short '
+                'one.</p></div></body>' % seed)
+            summary = Document(html, domain='site',
+                               boilerplate=index).summary()
+            self.assertTrue('Paragraph 7 of story 0' in summary)
+        self.assertEqual(5, index.documents('site'))
+
+    def test_links_outweigh_article(self):
+        # the article is kept though changing links hold most of the text
+        index = BoilerplateIndex(min_documents=3)
+        for seed in range(5):
+            links = ''.join('<a href="/%d/%d">Story %d of day %d</a> '
+                            % (seed, i, i, seed) for i in range(60))
+            html = page(0).replace(
+                '</body>', '<div class="links"><p>%s</p></div></body>' % links)
+            summary = Document(html, domain='site',
+                               boilerplate=index).summary()
+            self.assertTrue('Paragraph 7 of story 0' in summary)
+        self.assertEqual(5, index.documents('site'))
+
+    def test_other_domain(self):
+        index = BoilerplateIndex(min_documents=1)
+        Document(page(0), domain='site', boilerplate=index).summary()
+        summary = Document(page(1), domain='other',
+                           boilerplate=index).summary()
+        self.assertTrue('newsletter' in summary)
+
+    def test_bounded(self):
+        index = BoilerplateIndex(max_blocks=10, max_domains=2)
+        for domain in ['a', 'b', 'c']:
+            index.add(domain, range(25))
+        self.assertEqual(0, index.documents('a'))
+        self.assertTrue(len(index._domains.get('c')['counts']) <= 10)
+
+    def test_pickle(self):
+        index = BoilerplateIndex(threshold=0.8)
+        self.assertTrue(pickle.loads(pickle.dumps(index)) is index)
@@ -0,0 +1,59 @@
+import unittest
+
+import lxml.html
+
+from readability import Document
+from readability.htmls import truncate_tree
+from readability.stats import Stats
+
+from .utils import load_sample
+
+
+class TestBudget(unittest.TestCase):
+    """Documents over budget should still give a result, and say why"""
+
+    def test_within_budget(self):
+        sample = load_sample('si-game.sample.html')
+        doc = Document(sample, max_bytes=len(sample), max_nodes=100000,
+                       time_budget=60)
+        self.assertEqual(Document(sample).summary(), doc.summary())
+        self.assertEqual([], doc.budget_exhausted)
+
+    def test_max_bytes(self):
+        sample = load_sample('si-game.sample.html')
+        doc = Document(sample, max_bytes=len(sample) // 2)
+        summary = doc.summary()
+        self.assertEqual(['max_bytes'], doc.budget_exhausted)
+        self.assertFalse('Verlander looks to continue' in summary)
+        self.assertTrue('Verlander looks to continue' in Document(sample).summary())
+
+    def test_max_nodes(self):
+        sample = load_sample('si-game.sample.html')
+        stats = Stats(count_nodes=False)
+        doc = Document(sample, max_nodes=200, stats=stats)
+        doc.summary()
+        self.assertEqual(['max_nodes'], doc.budget_exhausted)
+        self.assertTrue(stats.counters['budget_max_nodes'] >= 1)
+
+    def test_time_budget(self):
+        sample = load_sample('si-game.sample.html')
+        stats = Stats(count_nodes=False)
+        doc = Document(sample, time_budget=0, stats=stats)
+        self.assertTrue(doc.summary())
+        self.assertEqual(['time_budget'], doc.budget_exhausted)
+        # out of time, the less ruthless pass is never tried
+        self.assertFalse('retries' in stats.counters)
+        self.assertFalse('unlikely' in stats.stages)
+
+
+class TestTruncateTree(unittest.TestCase):
+
+    def test_prefix(self):
+        html = ('<html><body><div><p>a<b>b</b>c</p>d<p>e</p></div>'
+                '<ul><li>f</li><li>g</li></ul></body></html>')
+        tags = [e.tag for e in lxml.html.document_fromstring(html).iter()]
+        for max_nodes in range(1, len(tags) + 2):
+            doc = lxml.html.document_fromstring(html)
+            self.assertEqual(max_nodes < len(tags),
+                             truncate_tree(doc, max_nodes))
+            self.assertEqual(tags[:max_nodes], [e.tag for e in doc.iter()])
@@ -0,0 +1,95 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from readability import Document
+from readability.batch import extract_batch
+from readability.boilerplate import BoilerplateIndex
+from readability.cache import ResultCache
+from readability.cache import SQLiteStore
+from readability.templates import TemplateCache
+
+from .utils import load_sample
+
+
+class TestResultCache(unittest.TestCase):
+    """The same input and options should give the cached results"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sample = load_sample('si-game.sample.html')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_memory(self):
+        cache = ResultCache()
+        doc = Document(self.sample)
+        for _ in range(2):
+            cached = Document(self.sample, cache=cache)
+            self.assertEqual(doc.summary(), cached.summary())
+            self.assertEqual(doc.title(), cached.title())
+            self.assertEqual(doc.short_title(), cached.short_title())
+        self.assertEqual((3, 3), (cache.hits, cache.misses))
+
+    def test_options(self):
+        cache = ResultCache()
+        Document(self.sample, cache=cache).summary()
+        Document(self.sample, cache=cache).summary(html_partial=True)
+        Document(self.sample, cache=cache, url='http://x.com/').summary()
+        Document(self.sample.encode('utf-8'), cache=cache).summary()
+        self.assertEqual((1, 3), (cache.hits, cache.misses))
+
+    def test_budget_exhausted(self):
+        cache = ResultCache()
+        Document(self.sample, cache=cache, time_budget=0).summary()
+        self.assertEqual(0, len(cache.memory))
+
+    def test_stateful_options(self):
+        # pages must reach the index and the templates every time
+        cache = ResultCache()
+        index = BoilerplateIndex()
+        Document(self.sample, cache=cache).summary()
+        Document(self.sample, cache=cache, domain='s',
+                 boilerplate=index).summary()
+        Document(self.sample, cache=cache, domain='s',
+                 templates=TemplateCache()).summary()
+        self.assertEqual(1, index.documents('s'))
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+    def test_store(self):
+        path = os.path.join(self.directory, 'results.db')
+        summary = Document(self.sample,
+                           cache=ResultCache(store=SQLiteStore(path))).summary()
+        cache = ResultCache(store=SQLiteStore(path))
+        self.assertEqual(summary, Document(self.sample, cache=cache).summary())
+        self.assertEqual(1, cache.hits)
+
+    def test_pickle(self):
+        """A cache sent to a process stays one object there"""
+        cache = ResultCache(store=SQLiteStore(':memory:'))
+        self.assertTrue(pickle.loads(pickle.dumps(cache)) is cache)
+
+    def test_pickle_not_pinned(self):
+        import gc
+        import weakref
+        cache = ResultCache()
+        pickle.dumps(cache)
+        ref = weakref.ref(cache)
+        del cache
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_batch(self):
+        path = os.path.join(self.directory, 'results.db')
+        cache = ResultCache(store=SQLiteStore(path))
+        items = [(self.sample, {'cache': cache})] * 3
+        first = list(extract_batch(items, processes=2))
+        second = list(extract_batch(items, processes=2))
+        self.assertEqual([r.summary for r in first],
+                         [r.summary for r in second])
+        self.assertEqual(None, second[0].error)
+        self.assertEqual(3, len(SQLiteStore(path)._connect().execute(
+            'SELECT key FROM results').fetchall()))
@@ -0,0 +1,61 @@
+import unittest
+
+from lxml.etree import tounicode
+from lxml.html import fragment_fromstring
+
+from readability.cleaners import clean_attributes
+from readability.cleaners import strip_bad_attributes
+
+
+class TestStripBadAttributes(unittest.TestCase):
+    """The tree pass should remove what the regexp loop removes"""
+
+    def test_same_as_clean_attributes(self):
+        html = (
+            '<div width="10" class="a" bgcolor="#fff" height=\'5\'>'
+            '<table background="x.png" background-color="red" summary="s" '
+            'border="1"><tr><td WIDTH="3" Color="red" font-color="blue" '
+            'valign="top">x</td></tr></table>'
+            '<p o="1" on="2" onclick="f()" data-width="4" style="color: red"'
+            ' width="">text</p></div>')
+        doc = fragment_fromstring(html)
+        expected = clean_attributes(tounicode(doc))
+        strip_bad_attributes(doc)
+        self.assertEqual(expected, tounicode(doc))
+        self.assertTrue('summary="s"' in expected)
+
+
+class TestCleanWhileParsing(unittest.TestCase):
+    """Cleaning while parsing should give the results the cleaner does"""
+
+    def test_same_results(self):
+        import os
+        from readability import Document
+        from readability.htmls import build_doc
+        from lxml.etree import Comment
+
+        html = open(os.path.join(os.path.dirname(__file__), 'samples',
+                                 'si-game.sample.html')).read()
+        html = html.replace('<body', '<?php x ?><noscript><p>Please enable '
+                            'scripts</p></noscript><form><input name="q">'
+                            '<button>Search</button> Find</form><body', 1)
+        for method in ['summary', 'title', 'short_title', 'text', 'metadata']:
+            self.assertEqual(
+                getattr(Document(html), method)(),
+                getattr(Document(html, clean_while_parsing=True), method)())
+        doc = build_doc(html, lean=True)
+        self.assertEqual([], list(doc.iter(Comment)))
+        self.assertTrue(len(list(build_doc(html).iter(Comment))) > 0)
+
+    def test_caller_tree_untouched(self):
+        from readability import Document
+        from lxml.html import document_fromstring
+
+        tree = document_fromstring(
+            '<html><body><script>x</script><div><p>Some text, long enough '
+            'to be kept as the article.</p><form><input></form></div>'
+            '</body></html>')
+        before = tounicode(tree)
+        for options in [{'clean_while_parsing': True}, {'max_nodes': 3}]:
+            Document(tree, **options).summary()
+            self.assertEqual(before, tounicode(tree))
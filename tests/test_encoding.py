@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import codecs
+import unittest
+
+from readability import Document
+from readability.encoding import get_encoding
+from readability.htmls import build_doc
+
+
+PAGE = u'<html><head>%s</head><body><p>%s</p></body></html>'
+TEXT = u'Привет, мир! Это проверка кодировки страницы. ' * 20
+
+
+class TestGetEncoding(unittest.TestCase):
+    """Declarations and BOMs should be honored before guessing"""
+
+    def test_bom(self):
+        page = codecs.BOM_UTF8 + (PAGE % ('', TEXT)).encode('utf-8')
+        self.assertEqual('utf-8', get_encoding(page))
+        page = (PAGE % ('', TEXT)).encode('utf-16')
+        self.assertEqual('utf-16', get_encoding(page))
+
+    def test_meta_charset(self):
+        page = PAGE % ('<meta charset="windows-1251">', TEXT)
+        self.assertEqual('cp1251', get_encoding(page.encode('cp1251')))
+
+    def test_http_equiv(self):
+        page = PAGE % ('<meta http-equiv="Content-Type" '
+                       'content="text/html; charset=koi8-r">', TEXT)
+        self.assertEqual('koi8-r', get_encoding(page.encode('koi8-r')))
+
+    def test_transport_charset(self):
+        page = (PAGE % ('', TEXT)).encode('koi8-r')
+        self.assertEqual('koi8-r', get_encoding(page, 'KOI8-R'))
+
+    def test_wrong_declaration(self):
+        """UTF-8 pages declared in a legacy charset are read as UTF-8"""
+        page = PAGE % ('<meta charset="iso-8859-1">', TEXT)
+        self.assertEqual('utf-8', get_encoding(page.encode('utf-8')))
+        page = PAGE % ('<meta charset="utf-8">', TEXT)
+        self.assertNotEqual('utf-8', get_encoding(page.encode('cp1251')))
+
+    def test_utf16_declaration(self):
+        """A declared UTF-16 on a page readable as ASCII means UTF-8"""
+        page = PAGE % ('<meta charset="utf-16">', TEXT)
+        self.assertEqual('utf-8', get_encoding(page.encode('utf-8')))
+        page = PAGE % ('<meta charset="UTF-32LE">', 'Plain text')
+        self.assertEqual('utf-8', get_encoding(page.encode('ascii')))
+        # a transport charset is taken at its word when the page decodes
+        page = (PAGE % ('', TEXT)).encode('utf-16-le')
+        self.assertEqual('utf-16-le', get_encoding(page, 'utf-16-le'))
+
+    def test_detectors(self):
+        page = (PAGE % ('', TEXT)).encode('cp1251')
+        self.assertEqual('koi8-r', get_encoding(
+            page, detectors=[lambda text: None, lambda text: 'koi8-r']))
+
+
+class TestBuildDoc(unittest.TestCase):
+    """Bytes are parsed in their own encoding, as if decoded first"""
+
+    def text(self, page, charset=None):
+        return build_doc(page, charset).findtext('.//p')
+
+    def test_legacy_charset(self):
+        page = PAGE % ('<meta charset="windows-1251">', TEXT)
+        self.assertEqual(TEXT, self.text(page.encode('cp1251')))
+        page = (PAGE % ('', TEXT)).encode('koi8-r')
+        self.assertEqual(TEXT, self.text(page, 'koi8-r'))
+
+    def test_bytes_like(self):
+        page = (PAGE % ('', TEXT)).encode('utf-8')
+        self.assertEqual(TEXT, self.text(bytearray(page)))
+        self.assertEqual(TEXT, self.text(memoryview(page)))
+
+    def test_invalid_bytes(self):
+        page = (PAGE % ('', TEXT)).encode('utf-8')
+        page = page.replace(u'мир'.encode('utf-8'), b'\xff\xfe\xff', 1)
+        self.assertEqual(TEXT.replace(u'мир', u'\ufffd' * 3, 1),
+                         self.text(page, 'utf-8'))
+
+    def test_utf16_declaration(self):
+        page = ('<html><head><meta charset="utf-16">'
+                '<title>Hello there world</title></head>'
+                '<body><p>%s</p></body></html>'
+                % ('Some text, long enough to be the article. ' * 5))
+        doc = Document(page.encode('ascii'))
+        self.assertEqual('Hello there world', doc.title())
+        self.assertTrue('long enough to be the article' in doc.summary())
@@ -0,0 +1,40 @@
+import unittest
+
+import lxml.html
+
+from readability import Document
+from readability.lru import LRUCache
+from readability.readability import class_id_cache
+from readability.readability import class_id_matches
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(None, cache.get('b'))
+        self.assertEqual([('a', 1), ('c', 3)], cache.items())
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+
+class TestClassIdMatches(unittest.TestCase):
+    """Class and id matches are computed once per string"""
+
+    def test_matches(self):
+        self.assertEqual((2, 0, True, False),
+                         class_id_matches('sidebar-comment'))
+        self.assertEqual((0, 2, False, True),
+                         class_id_matches('article-content'))
+
+    def test_class_weight(self):
+        doc = Document('<div/>')
+        div = lxml.html.fragment_fromstring(
+            '<div class="article sidebar" id="comment"/>')
+        hits = class_id_cache.hits
+        self.assertEqual(25 - 35 - 35, doc.class_weight(div))
+        self.assertEqual(25 - 35 - 35, doc.class_weight(div))
+        self.assertTrue(class_id_cache.hits >= hits + 2)
@@ -0,0 +1,66 @@
+import unittest
+
+from readability import Document
+
+from .utils import load_sample
+
+
+PAGE = '''<html><head><title>Widget review</title>
+<meta name="description" content="All about the widget">
+<meta property="og:title" content="Widget | Example">
+<meta name="generator" content="ignored">
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@graph": [
+  {"@type": "NewsArticle", "headline": "Widget review",
+   "author": [{"@type": "Person", "name": "Ann"}],
+   "datePublished": "2020-01-02"},
+  {"@type": ["Product"], "name": "Widget", "brand": {"name": "Acme"},
+   "offers": [{"price": "9.99", "priceCurrency": "USD"}]}]}
+</script>
+<script type="application/ld+json">{not json</script>
+</head><body>
+<div itemprop="brand">Acme</div>
+<footer><span itemprop="name">Footer name</span></footer>
+<div><p>%s</p><span itemprop="name" content="Widget 2">x</span></div>
+</body></html>''' % ('Text about the widget. ' * 20)
+
+
+class TestMetadata(unittest.TestCase):
+    """metadata() should give the values summary() adds, and JSON-LD"""
+
+    def test_values(self):
+        metadata = Document(PAGE).metadata()
+        self.assertEqual({'description': 'All about the widget',
+                          'og:title': 'Widget | Example'}, metadata['meta'])
+        # microdata within footers and the like is left out
+        self.assertEqual({'brand': 'Acme', 'name': 'Widget 2'},
+                         metadata['itemprop'])
+        self.assertEqual({'headline': 'Widget review', 'author': ['Ann'],
+                          'datePublished': '2020-01-02'},
+                         metadata['article'])
+        self.assertEqual({'name': 'Widget', 'brand': 'Acme', 'price': '9.99',
+                          'priceCurrency': 'USD'}, metadata['product'])
+
+    def test_parse_once(self):
+        self.assertEqual(Document(PAGE).metadata(),
+                         Document(PAGE, parse_once=True).metadata())
+
+    def test_summary_unchanged(self):
+        summary = Document(PAGE).summary()
+        self.assertTrue('<p class="econtextmax meta description">All about '
+                        'the widget</p>' in summary)
+        self.assertTrue('<p class="econtextmax itemprop name">Widget 2</p>'
+                        in summary)
+
+    def test_no_injection(self):
+        doc = Document(PAGE, inject_meta=False)
+        summary = doc.summary()
+        self.assertFalse('econtextmax' in summary)
+        self.assertIsNone(doc.metaTags)
+        self.assertEqual('Acme', doc.metadata()['itemprop']['brand'])
+        sample = load_sample('si-game.sample.html')
+        self.assertEqual(Document(sample, inject_meta=False).text(),
+                         Document(sample).text())
+        self.assertEqual(Document(sample, inject_meta=False).text(),
+                         Document(sample, inject_meta=False).text(
+                             include_meta=True))
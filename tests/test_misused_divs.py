@@ -0,0 +1,33 @@
+import unittest
+
+from lxml.html import document_fromstring
+
+from readability import Document
+
+
+class TestMisusedDivs(unittest.TestCase):
+    """Only <div>s without block descendants should become <p>s"""
+
+    def transform(self, body):
+        doc = Document('')
+        doc.html = document_fromstring('<html><body>%s</body></html>' % body)
+        doc.transform_misused_divs_into_paragraphs()
+        return [e.tag for e in doc.html.find('body').iter()][1:]
+
+    def test_inline_content(self):
+        self.assertEqual(['p', 'span'],
+                         self.transform('<div>text <span>x</span></div>'))
+
+    def test_nested_block(self):
+        """An <img> buried inside inline elements still counts"""
+        self.assertEqual(['div', 'span', 'b', 'img'], self.transform(
+            '<div><span><b><img src="x.png"></b></span></div>'))
+
+    def test_tag_prefix(self):
+        """Like the regexp, <abbr> matches as it starts with "a" """
+        self.assertEqual(['div', 'abbr'],
+                         self.transform('<div><abbr>x</abbr></div>'))
+
+    def test_nested_divs(self):
+        self.assertEqual(['div', 'p', 'i'],
+                         self.transform('<div><div><i>x</i></div></div>'))
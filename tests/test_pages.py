@@ -0,0 +1,230 @@
+import threading
+import unittest
+
+from lxml.html import document_fromstring
+
+from readability.pages import FetchError
+from readability.pages import Fetcher
+from readability.pages import HTTPFetcher
+from readability.pages import Stitcher
+from readability.pages import base_url
+from readability.pages import next_page_url
+from readability.readability import Unparseable
+
+from .utils import load_sample
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+def page(number, pages=3, story='story'):
+    links = ''.join('<a href="/%s/%d">%d</a> ' % (story, i, i)
+                    for i in range(1, pages + 1))
+    if number < pages:
+        links += '<a href="/%s/%d">Next &raquo;</a>' % (story, number + 1)
+    return ('<html><head><title>Story</title>'
+            '<meta name="description" content="The whole story"></head><body>'
+            '<div class="article"><p>Part %d of the %s, told at length, with'
+            ' commas, so that it is scored as the content of the page.</p>'
+            '<p>More of part %d of the %s, so that there is enough text in'
+            ' the article for it to be found, and kept, on its own.</p></div>'
+            '<div class="pagination">%s</div></body></html>'
+            % (number, story, number, story, links))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.client_address, self.path))
+        body = self.server.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if body.startswith('redirect:'):
+            self.send_response(301)
+            self.send_header('Location', body[len('redirect:'):])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestNextPage(unittest.TestCase):
+    """next_page_url should pick the link readability.js picks"""
+
+    def next(self, html, url='http://example.com/story/1'):
+        doc = document_fromstring(html)
+        doc.make_links_absolute(url)
+        return next_page_url(doc, url)
+
+    def test_base_url(self):
+        self.assertEqual('http://example.com/story',
+                         base_url('http://example.com/story/2'))
+        self.assertEqual('http://example.com/news/story',
+                         base_url('http://example.com/news/story-p2.html'))
+        self.assertEqual('http://example.com/news/story',
+                         base_url('http://example.com/news/story/index.html'))
+
+    def test_next(self):
+        self.assertEqual('http://example.com/story/2', self.next(page(1)))
+        self.assertEqual('http://example.com/story/3',
+                         self.next(page(2), 'http://example.com/story/2'))
+        self.assertEqual(None,
+                         self.next(page(3), 'http://example.com/story/3'))
+
+    def test_ignored_links(self):
+        self.assertEqual(None, self.next(
+            '<p><a href="/story/0">&laquo; Previous</a>'
+            '<a href="/story/1?print=1">Print page 2</a>'
+            '<a href="http://other.com/story/2">Next</a>'
+            '<a href="/about">Next</a></p>'))
+
+    def test_no_links(self):
+        self.assertEqual(None, self.next('<p>Nothing to follow</p>'))
+
+
+class DictFetcher(Fetcher):
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def fetch(self, url, max_bytes=None):
+        self.fetched.append(url)
+        if url not in self.pages:
+            raise FetchError(url)
+        return self.pages[url].encode('utf-8'), 'utf-8'
+
+
+class TestStitcher(unittest.TestCase):
+    """Stitcher should append the pages of an article in order, within its
+    limits, fetched from a local server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(('127.0.0.1', 0), Handler)
+        cls.server.pages = {}
+        cls.server.requests = []
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.root = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.pages.clear()
+        del self.server.requests[:]
+
+    def serve(self, story, pages):
+        for number in range(1, pages + 1):
+            self.server.pages['/%s/%d' % (story, number)] = page(
+                number, pages, story)
+        return page(1, pages, story), '%s/%s/1' % (self.root, story)
+
+    def test_stitch(self):
+        html, url = self.serve('story', 3)
+        with Stitcher() as stitcher:
+            stitched = stitcher.stitch(html, url)
+        self.assertEqual(['%s/story/%d' % (self.root, i) for i in range(1, 4)],
+                         stitched.urls)
+        parts = [stitched.html.find('Part %d of' % i) for i in range(1, 4)]
+        self.assertTrue(0 < parts[0] < parts[1] < parts[2])
+        self.assertTrue(stitched.html.startswith('<html><body>'))
+        self.assertTrue('readability-page-3' in stitched.html)
+        # the keep-alive connection served every page
+        self.assertEqual(2, len(self.server.requests))
+        self.assertEqual(1, len(set(c for c, _ in self.server.requests)))
+
+    def test_limits(self):
+        html, url = self.serve('story', 5)
+        with Stitcher(max_pages=2) as stitcher:
+            stitched = stitcher.stitch(html, url, html_partial=True)
+        self.assertEqual(2, len(stitched.urls))
+        self.assertTrue(stitched.html.startswith('<div>'))
+        with Stitcher(max_fetch_bytes=len(page(2, 5)) + 10) as stitcher:
+            self.assertEqual(2, len(stitcher.stitch(html, url).urls))
+        with Stitcher(max_fetch_bytes=10) as stitcher:
+            self.assertEqual(1, len(stitcher.stitch(html, url).urls))
+
+    def test_missing_page(self):
+        html, url = self.serve('story', 3)
+        del self.server.pages['/story/3']
+        with Stitcher() as stitcher:
+            stitched = stitcher.stitch(html, url)
+        self.assertEqual(2, len(stitched.urls))
+        self.assertTrue('Part 2 of' in stitched.html)
+
+    def test_empty_page(self):
+        html, url = self.serve('story', 3)
+        self.server.pages['/story/2'] = ''
+        with Stitcher() as stitcher:
+            stitched = stitcher.stitch(html, url)
+            self.assertRaises(Unparseable, stitcher.stitch, '', url)
+        self.assertEqual([url], stitched.urls)
+        self.assertTrue('Part 1 of' in stitched.html)
+
+    def test_redirect(self):
+        html, url = self.serve('story', 2)
+        self.server.pages['/story/2'] = 'redirect:/moved/2'
+        self.server.pages['/moved/2'] = page(2, 2)
+        fetcher = HTTPFetcher()
+        try:
+            body, charset = fetcher.fetch(self.root + '/story/2')
+            self.assertRaises(FetchError, fetcher.fetch,
+                              self.root + '/nothing')
+        finally:
+            fetcher.close()
+        self.assertEqual('utf-8', charset)
+        self.assertTrue(b'Part 2 of' in body)
+
+    def test_stitch_many(self):
+        items = [self.serve('story%d' % i, i) for i in range(1, 5)]
+        with Stitcher(max_concurrency=2) as stitcher:
+            results = list(stitcher.stitch_many(items))
+        self.assertEqual([1, 2, 3, 4], [len(r.urls) for r in results])
+        for i, result in enumerate(results):
+            self.assertTrue('of the story%d' % (i + 1) in result.html)
+
+    def test_fetcher(self):
+        pages = dict(('http://example.com/story/%d' % i, page(i))
+                     for i in range(2, 4))
+        fetcher = DictFetcher(pages)
+        stitcher = Stitcher(fetcher)
+        stitched = stitcher.stitch(page(1), 'http://example.com/story/1')
+        stitcher.close()
+        self.assertEqual(3, len(stitched.urls))
+        self.assertEqual(sorted(pages), fetcher.fetched)
+        # the meta paragraphs only come with the first page
+        self.assertEqual(1, stitched.html.count('The whole story'))
+
+    def test_sample(self):
+        # a page without a next page is its own article
+        sample = load_sample('si-game.sample.html')
+        stitcher = Stitcher(DictFetcher({}))
+        stitched = stitcher.stitch(sample, 'http://sportsillustrated.cnn.com/')
+        stitcher.close()
+        self.assertEqual(1, len(stitched.urls))
+        self.assertTrue('Detroit' in stitched.html)
@@ -0,0 +1,31 @@
+import unittest
+
+from readability import Document
+
+from .utils import load_sample
+
+
+class TestParseOnce(unittest.TestCase):
+    """The parse_once mode should share one parse across every method"""
+
+    def test_same_output(self):
+        """parse_once gives the same results as reparsing every time"""
+        sample = load_sample('si-game.sample.html')
+        plain = Document(sample)
+        shared = Document(sample, parse_once=True)
+        self.assertEqual(plain.summary(), shared.summary())
+        self.assertEqual(plain.title(), shared.title())
+        self.assertEqual(plain.short_title(), shared.short_title())
+
+    def test_parses_once(self):
+        """The input is parsed a single time however many methods run"""
+        sample = load_sample('si-game.sample.html')
+        doc = Document(sample, parse_once=True)
+        calls = []
+        parse = doc._parse
+        doc._parse = lambda input: calls.append(input) or parse(input)
+        doc.summary()
+        doc.short_title()
+        doc.title()
+        doc.content()
+        self.assertEqual(1, len(calls))
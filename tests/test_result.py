@@ -0,0 +1,68 @@
+import unittest
+
+from readability import Document, extract
+from readability.result import ExtractResult
+
+from .utils import load_sample
+
+
+class TestExtract(unittest.TestCase):
+    """extract() should give what Document does, computing fields lazily"""
+
+    def test_same_as_document(self):
+        sample = load_sample('si-game.sample.html')
+        result = extract(sample)
+        doc = Document(sample)
+        self.assertEqual(doc.text(), result.text)
+        self.assertEqual(doc.summary(), result.html)
+        self.assertEqual(doc.title(), result.title)
+        self.assertEqual(doc.short_title(), result.short_title)
+        self.assertEqual(doc.best_score, result.score)
+        self.assertEqual(doc.best_locator, result.locator)
+        self.assertEqual(doc.retried, result.retried)
+        self.assertTrue(result.retried)
+        self.assertEqual('div', result.locator[-1][0])
+
+    def test_lazy(self):
+        result = extract(load_sample('si-game.sample.html'))
+        self.assertFalse(hasattr(result, '__dict__'))
+        document = result._document
+        self.assertIsNone(document.html)
+        result.title
+        self.assertIsNone(document.html)
+        text = result.text
+        article = document.html
+        self.assertIs(text, result.text)
+        result.score, result.locator, result.retried
+        # the article was found once for all of them
+        self.assertIs(article, document.html)
+
+    def test_without_parse_once(self):
+        # title() and metadata() parse the page again into document.html
+        sample = load_sample('si-game.sample.html')
+        result = extract(sample, parse_once=False)
+        result.score, result.title, result.meta
+        doc = Document(sample)
+        self.assertEqual(doc.text(), result.text)
+        self.assertEqual(doc.summary(), result.html)
+
+    def test_meta(self):
+        html = ('<html><head><meta name="description" content="A page">'
+                '</head><body><div itemprop="name">Widget</div></body></html>')
+        result = extract(html)
+        self.assertEqual({'description': 'A page'}, result.meta['meta'])
+        self.assertEqual({'name': 'Widget'}, result.meta['itemprop'])
+        # the article does not keep the meta summary() adds
+        self.assertFalse('A page' in result.text)
+        self.assertTrue('A page' in result.html)
+
+    def test_lets_go_of_document(self):
+        result = extract(load_sample('si-game.sample.html'))
+        for name in ['html', 'text', 'title', 'short_title', 'meta', 'score',
+                     'locator']:
+            getattr(result, name)
+            self.assertIsNotNone(result._document)
+        result.retried
+        self.assertIsNone(result._document)
+        self.assertTrue(result.text)
+        self.assertTrue(isinstance(result, ExtractResult))
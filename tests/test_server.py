@@ -0,0 +1,155 @@
+import json
+import os
+import socket
+import threading
+import unittest
+
+from readability import Document
+from readability.server import ExtractionServer
+
+from .utils import load_sample
+
+try:
+    import queue
+    from http.client import HTTPConnection
+except ImportError:
+    import Queue as queue
+    from httplib import HTTPConnection
+
+
+class UnixHTTPConnection(HTTPConnection):
+
+    def __init__(self, path):
+        HTTPConnection.__init__(self, 'localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def request(connection, method, path, body=None, headers=None):
+    connection.request(method, path, body, headers or {})
+    response = connection.getresponse()
+    return response.status, response.read().decode('utf-8')
+
+
+class TestServer(unittest.TestCase):
+    """The server should answer as Document does, on localhost"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ExtractionServer(('127.0.0.1', 0), processes=1,
+                                      max_request_bytes=200000)
+        cls.server.start().serve_in_thread()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def connect(self):
+        return HTTPConnection(*self.server.address)
+
+    def test_extract(self):
+        sample = load_sample('si-game.sample.html')
+        connection = self.connect()
+        status, body = request(connection, 'POST', '/extract',
+                               sample.encode('utf-8'))
+        self.assertEqual(200, status)
+        result = json.loads(body)
+        self.assertEqual(Document(sample).summary(), result['summary'])
+        self.assertEqual(Document(sample).short_title(),
+                         result['short_title'])
+        self.assertIsNone(result['error'])
+        # the same connection, options in the query string or the JSON
+        status, body = request(connection, 'POST',
+                               '/extract?html_partial=1', sample)
+        self.assertTrue(json.loads(body)['summary'].startswith('<div>'))
+        status, body = request(
+            connection, 'POST', '/extract',
+            json.dumps({'html': sample, 'html_partial': True}),
+            {'Content-Type': 'application/json'})
+        self.assertTrue(json.loads(body)['summary'].startswith('<div>'))
+
+    def test_errors(self):
+        connection = self.connect()
+        self.assertEqual(422, request(connection, 'POST', '/extract', '')[0])
+        self.assertEqual(400, request(connection, 'POST',
+                                      '/extract?debug=1', 'x')[0])
+        self.assertEqual(404, request(self.connect(), 'GET', '/nowhere')[0])
+        self.assertEqual(413, request(self.connect(), 'POST', '/extract',
+                                      'x' * 200001)[0])
+        connection = self.connect()
+        connection.putrequest('POST', '/extract')
+        connection.putheader('Content-Length', '-1')
+        connection.endheaders()
+        self.assertEqual(400, connection.getresponse().status)
+
+    def test_health_and_metrics(self):
+        connection = self.connect()
+        self.assertEqual((200, 'ok\n'), request(connection, 'GET', '/health'))
+        request(connection, 'POST', '/extract', '<p>Some text</p>')
+        status, metrics = request(connection, 'GET', '/metrics')
+        self.assertEqual(200, status)
+        for line in ['readability_requests_total{code="200"}',
+                     'readability_queue_depth 0',
+                     'readability_workers 1',
+                     'readability_throughput',
+                     'readability_request_seconds_bucket{le="+Inf"}',
+                     'readability_extraction_seconds_count']:
+            self.assertTrue(line in metrics, line)
+
+
+class TestServerUnix(unittest.TestCase):
+
+    def test_unix_socket(self):
+        path = os.path.join(os.path.dirname(__file__),
+                            'readability-test-%d.sock' % os.getpid())
+        with ExtractionServer(unix_socket=path, processes=1) as server:
+            server.serve_in_thread()
+            status, body = request(UnixHTTPConnection(path), 'POST',
+                                   '/extract', '<title>A title</title>')
+            self.assertEqual(200, status)
+            self.assertEqual('A title', json.loads(body)['title'])
+        self.assertFalse(os.path.exists(path))
+
+
+class TestQueue(unittest.TestCase):
+    """Documents should queue up to a limit, small ones in batches"""
+
+    def test_backpressure(self):
+        server = ExtractionServer(processes=1, max_queue=1)
+        server.submit('<p>one</p>')
+        self.assertRaises(queue.Full, server.submit, '<p>two</p>')
+
+    def test_batching(self):
+        server = ExtractionServer(('127.0.0.1', 0), processes=1,
+                                  batch_size=4, batch_wait=0.5)
+        jobs = [server.submit('<title>Page %d</title>' % i) for i in range(3)]
+        jobs.append(server.submit('<title>Big</title>' + ' ' * 40000))
+        with server:
+            self.assertEqual(['Page 0', 'Page 1', 'Page 2', 'Big'],
+                             [job.wait().title for job in jobs])
+            self.assertEqual(4, server.metrics.documents)
+            # the large document went on its own
+            self.assertEqual(2, server.metrics.batches)
+
+    def test_shutdown_while_batching(self):
+        server = ExtractionServer(('127.0.0.1', 0), processes=1,
+                                  batch_size=4, batch_wait=30).start()
+        job = server.submit('<title>Alone</title>')
+        stopping = threading.Thread(target=server.shutdown)
+        stopping.start()
+        stopping.join(10)
+        self.assertFalse(stopping.is_alive())
+        job.wait(1)
+
+    def test_lost_worker(self):
+        # a chunk whose worker died never calls back
+        with ExtractionServer(('127.0.0.1', 0), processes=1,
+                              result_timeout=0.2) as server:
+            server.pool.apply_async = lambda *args, **kwargs: None
+            result = server.submit('<title>Lost</title>').wait(10)
+            self.assertTrue(result.error.startswith('WorkerLost'))
+            self.assertEqual(0, server.in_flight)
+            self.assertEqual({}, server._pending)
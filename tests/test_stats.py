@@ -0,0 +1,41 @@
+import unittest
+
+from readability import Document
+from readability.stats import Stats
+
+from .utils import load_sample
+
+
+class TestStats(unittest.TestCase):
+    """Stats should see every stage of summary()"""
+
+    def test_stages(self):
+        sample = load_sample('si-game.sample.html')
+        stats = Stats()
+        summary = Document(sample, stats=stats).summary()
+        self.assertEqual(Document(sample).summary(), summary)
+
+        names = list(stats.stages)
+        for name in ['parse', 'clean', 'links', 'meta', 'badtags', 'unlikely',
+                     'transform', 'score', 'article', 'sanitize',
+                     'clean_attributes']:
+            self.assertTrue(name in names, name)
+        # the sample needs the second, less ruthless pass
+        self.assertEqual(1, stats.counters['retries'])
+        parse = stats.stages['parse']
+        self.assertEqual(2, parse['runs'])
+        self.assertEqual(None, parse['nodes_before'])
+        self.assertTrue(parse['nodes_after'] > 0)
+
+        # more documents only add to the same stages
+        Document(sample, stats=stats).summary()
+        self.assertEqual(names, list(stats.stages))
+        self.assertEqual(4, stats.stages['parse']['runs'])
+
+    def test_without_counting_nodes(self):
+        stats = Stats(count_nodes=False)
+        Document(load_sample('si-game.sample.html'), stats=stats).title()
+        self.assertEqual([], [name for name, stage in stats.stages.items()
+                              if stage['nodes_before'] is not None or
+                              stage['nodes_after'] is not None])
+        self.assertTrue(stats.totals()['parse'] > 0)
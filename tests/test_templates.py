@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import lxml.html
+
+from readability import Document
+from readability.templates import TemplateCache
+from readability.templates import domain_of
+from readability.templates import find
+from readability.templates import locate
+
+from .utils import load_sample
+
+
+PAGE = ('<html><body><div class="nav"><a href="/">home</a></div>'
+        '<div id="main"><div class="story">%s</div></div></body></html>')
+
+
+class TestLocator(unittest.TestCase):
+
+    def test_find(self):
+        doc = lxml.html.document_fromstring(PAGE % '<p>text</p>')
+        story = doc.find('.//div[@class="story"]')
+        locator = locate(story)
+        self.assertEqual(('div', 'main', ''), locator[-2])
+        other = lxml.html.document_fromstring(PAGE % '<p>other</p>')
+        self.assertEqual('other', find(other, locator).text_content())
+        self.assertEqual(None, find(other, locator[:-1] + [('div', '', 'x')]))
+
+    def test_domain(self):
+        self.assertEqual('example.com',
+                         domain_of(url='http://Example.com:8080/a'))
+        self.assertEqual('site', domain_of('site', 'http://example.com/'))
+        self.assertEqual(None, domain_of())
+
+
+class TestTemplateCache(unittest.TestCase):
+    """Later pages of a domain should reuse where the article was"""
+
+    def test_reuse(self):
+        sample = load_sample('si-game.sample.html')
+        url = 'http://sportsillustrated.cnn.com/baseball/mlb/gameflash/'
+        expected = Document(sample, url=url).summary()
+        templates = TemplateCache()
+        for _ in range(3):
+            summary = Document(sample, url=url, templates=templates).summary()
+            self.assertEqual(expected, summary)
+        self.assertEqual((2, 1, 0), (templates.hits, templates.misses,
+                                     templates.rejected))
+        # the sample needs the less ruthless pass
+        self.assertFalse(templates.get('sportsillustrated.cnn.com')['ruthless'])
+
+    def test_rejected(self):
+        templates = TemplateCache(min_text_length=10)
+        story = '<p>%s</p>' % ('A long enough paragraph of text, really. ' * 10)
+        Document(PAGE % story, domain='site', templates=templates).summary()
+        self.assertEqual('story', templates.get('site')['path'][-1][2])
+        Document(PAGE % '<p>Too short</p>', domain='site',
+                 templates=templates).summary()
+        self.assertEqual(1, templates.rejected)
+
+    def test_bounded(self):
+        templates = TemplateCache(maxsize=2)
+        for domain in ['a', 'b', 'c']:
+            templates.set(domain, [('html', '', '')])
+        self.assertEqual(None, templates.get('a'))
+        self.assertEqual(2, len(templates))
+
+    def test_persistence(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'templates.json')
+            templates = TemplateCache(path=path)
+            templates.set('site', [('html', '', ''), ('body', '', '')], False)
+            templates.save()
+            self.assertEqual(templates.get('site'),
+                             TemplateCache(path=path).get('site'))
+        finally:
+            shutil.rmtree(directory)
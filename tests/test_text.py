@@ -0,0 +1,32 @@
+import unittest
+
+import lxml.html
+
+from readability import Document
+from readability.htmls import get_paragraphs
+
+from .utils import load_sample
+
+
+class TestText(unittest.TestCase):
+    """text() should give the text of the summary, a paragraph per line"""
+
+    def test_same_as_summary(self):
+        sample = load_sample('si-game.sample.html')
+        summary = lxml.html.fromstring(Document(sample).summary())
+        self.assertEqual(get_paragraphs(summary),
+                         Document(sample).text(include_meta=True).split('\n'))
+        text = Document(sample).text()
+        self.assertFalse('si.com' in text)
+        self.assertTrue(text.startswith('Tigers-Royals Preview\n'))
+
+    def test_paragraphs(self):
+        html = ('<div>First <!-- comment --> line<p>A  paragraph\n with '
+                '<b>bold</b> text</p>tail<ul><li>one</li><li>two<br>three'
+                '</li></ul><p> </p>&lt;end&gt;</div>')
+        div = lxml.html.fragment_fromstring(html)
+        self.assertEqual(['First line', 'A paragraph with bold text', 'tail',
+                          'one', 'two', 'three', '<end>'],
+                         get_paragraphs(div))
+        # the tree is left as it was
+        self.assertEqual(html, lxml.html.tostring(div, encoding='unicode'))
@@ -0,0 +1,44 @@
+import unittest
+
+from lxml.html import fragment_fromstring
+
+from readability.readability import text_length
+from readability.textindex import TextIndex
+
+
+def link_length(elem):
+    return sum(text_length(a) for a in elem.findall('.//a'))
+
+
+class TestTextIndex(unittest.TestCase):
+    """The index should agree with text_length() as the tree changes"""
+
+    html = (
+        '<div> <p>One,  two\t\t three\n  <a href="#">link\xa0 text</a>, '
+        'four</p>\n<div>  <span>x</span> y<a href="#"> more ,<a> nested'
+        '</a></a> tail  </div>\t<p>  </p><ul><li><img src="x.jpg"></li></ul>'
+        'last, words </div>')
+
+    def check(self, root, index):
+        for elem in root.iter():
+            self.assertEqual(text_length(elem), index.text_length(elem))
+            self.assertEqual(link_length(elem), index.link_length(elem))
+            self.assertEqual(elem.text_content().count(','),
+                             index.comma_count(elem))
+            self.assertEqual(elem.text_content().strip() == '',
+                             index.is_empty(elem))
+            for kind, count in index.tag_counts(elem).items():
+                self.assertEqual(len(elem.findall('.//%s' % kind)), count)
+
+    def test_matches_text_length(self):
+        root = fragment_fromstring(self.html)
+        self.check(root, TextIndex())
+
+    def test_drop_tree(self):
+        """Dropping nodes updates the ancestors, including merged tails"""
+        root = fragment_fromstring(self.html)
+        index = TextIndex()
+        self.check(root, index)
+        for tag in ('span', 'a', 'p', 'li'):
+            index.drop_tree(root.find('.//%s' % tag))
+            self.check(root, index)
@@ -0,0 +1,48 @@
+import unittest
+
+from readability import Document
+from readability.htmls import parse_to_title
+
+from .utils import load_sample
+
+
+class TestFastTitle(unittest.TestCase):
+    """fast_title should give the same titles from less of the page"""
+
+    def assertSameTitles(self, html, **options):
+        for method in ['title', 'short_title']:
+            self.assertEqual(
+                getattr(Document(html, **options), method)(),
+                getattr(Document(html, fast_title=True, **options), method)())
+
+    def test_sample(self):
+        sample = load_sample('si-game.sample.html')
+        self.assertSameTitles(sample)
+        self.assertSameTitles(sample.encode('utf-8'))
+        self.assertSameTitles(sample, max_nodes=20)
+        self.assertEqual('Detroit Tigers vs. Kansas City Royals - Preview - '
+                         'April 16, 2012',
+                         Document(sample, fast_title=True).title())
+
+    def test_cleaned_away(self):
+        # what the cleaner drops is not looked into
+        self.assertSameTitles(
+            '<noscript><title>Enable scripts please</title></noscript>'
+            '<title>A title long enough to shorten | Site</title>'
+            '<h1>A title long enough<!-- x --> to shorten</h1>'
+            '<div class="title">A title long enough<script>x</script></div>'
+            '<form id="title">A title long<button>go</button></form>')
+        self.assertSameTitles(b'<title>Caf\xe9 cr\xe8me br\xfbl\xe9e at the '
+                              b'corner</title><h2>Caf\xe9 cr\xe8me</h2>',
+                              charset='latin-1')
+
+    def test_stops_at_title(self):
+        html = '<title>Title</title><body>%s</body>' % (
+            '<p>A paragraph of text.</p>' * 2000)
+        self.assertTrue(len(parse_to_title(html).findall('.//p')) < 2000)
+        # a title too short to shorten needs nothing more
+        self.assertTrue(len(parse_to_title(html, shorten=True).findall(
+            './/p')) < 2000)
+        html = html.replace('Title', 'A title long enough to shorten')
+        self.assertEqual(2000, len(parse_to_title(html, shorten=True).findall(
+            './/p')))
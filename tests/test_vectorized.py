@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from readability import Document
+from readability import vectorized
+from readability.textindex import TextIndex
+
+from .utils import load_sample
+
+
+def scored(html, ruthless=True, **options):
+    doc = Document(html, **options)
+    doc._html(True)
+    if ruthless:
+        doc.remove_unlikely_candidates()
+    doc.transform_misused_divs_into_paragraphs()
+    doc._index = TextIndex()
+    return doc
+
+
+PAGE = '''<html><body>
+<div id="nav"><p><a href="/">Home</a>, <a href="/news">News</a>,
+<a href="/sport">Sport and everything else</a></p></div>
+<div class="article">
+<p>First paragraph of the story, long enough, with commas, to count.</p>
+<p>Second paragraph of the story, with a <a href="/x">link</a> in it.</p>
+<table><tr><td>A table cell with more than enough text to be scored.</td>
+<td>short</td></tr></table>
+<pre>Some preformatted text, long enough to be scored as well.</pre>
+</div>
+<div class="comment"><p>A comment that is long enough to be a paragraph.</p>
+</div>
+</body></html>'''
+
+
+@unittest.skipIf(vectorized.numpy is None, 'NumPy is not installed')
+class TestVectorized(unittest.TestCase):
+    """The vectorized engine should find the candidates, scores and order
+    score_paragraphs() finds"""
+
+    def assertSameCandidates(self, html, ruthless=True):
+        found = []
+        for option in [False, True]:
+            doc = scored(html, ruthless, vectorized=option)
+            candidates = doc.score_paragraphs()
+            best = doc.select_best_candidate(candidates)
+            nodes = list(doc.html.iter())
+            found.append((
+                [(nodes.index(elem), candidate['content_score'])
+                 for elem, candidate in candidates.items()],
+                best and nodes.index(best['elem'])))
+        self.assertEqual(found[0], found[1])
+
+    def test_sample(self):
+        sample = load_sample('si-game.sample.html')
+        self.assertSameCandidates(sample)
+        self.assertSameCandidates(sample, ruthless=False)
+        self.assertEqual(Document(sample).summary(),
+                         Document(sample, vectorized=True).summary())
+
+    def test_page(self):
+        self.assertSameCandidates(PAGE)
+        self.assertSameCandidates(PAGE, ruthless=False)
+
+    def test_ties(self):
+        # equal scores: the first candidate met wins
+        html = '<html><body>%s</body></html>' % ''.join(
+            '<div id="d%d"><p>%s</p></div>' % (i, 'Same text, same score. ' * 2)
+            for i in range(3))
+        self.assertSameCandidates(html)
+        doc = scored(html, vectorized=True)
+        best = doc.select_best_candidate(doc.score_paragraphs())
+        self.assertEqual('d0', best['elem'].get('id'))
+
+    def test_batch(self):
+        pages = [PAGE, load_sample('si-game.sample.html'),
+                 '<html><body><p>short</p></body></html>']
+        docs = [scored(page, ruthless=False) for page in pages]
+        trees = [vectorized.flatten(doc.html, doc._index, doc.class_weight)
+                 for doc in docs]
+        best = vectorized.best_candidates(trees)
+        self.assertEqual(None, best[2])
+        for doc, tree, found in zip(docs[:2], trees, best):
+            candidate = doc.select_best_candidate(doc.score_paragraphs())
+            self.assertTrue(tree.nodes[found[0]] is candidate['elem'])
+            self.assertEqual(candidate['content_score'], found[1])
+
+
+class TestImport(unittest.TestCase):
+    """NumPy should only be imported when vectorized scoring is asked for"""
+
+    def test_lazy(self):
+        import subprocess
+        import sys
+        code = ('import sys, readability.readability; '
+                'print("numpy" in sys.modules)')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=root)
+        self.assertEqual(b'False', output.strip())
@@ -0,0 +1,10 @@
+import os
+
+
+SAMPLES = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def load_sample(filename, mode='r'):
+    """Helper to get the content out of the sample files"""
+    with open(os.path.join(SAMPLES, filename), mode) as f:
+        return f.read()